@@ -1,6 +1,33 @@
-# from tensormodel import nsfw
-from tensormodel._ocr_idcard import *
-from tensormodel._ocr_marriagecard import *
-from tensormodel._ocr_householdcard import *
-from tensormodel._ocr_hukouben import *
-from tensormodel._ocr_wanshuipiao import *
\ No newline at end of file
+import importlib
+
+_lazy = {
+    'get_engine':'_ocr_engine',
+    'release_engine':'_ocr_engine',
+    'CachedEngine':'_ocr_engine',
+    'SQLiteStore':'_ocr_engine',
+    'OCRBackend':'_ocr_backend',
+    'ONNXBackend':'_ocr_backend',
+    'OCRIDCard':'_ocr_idcard',
+    'OCRMarriageCard':'_ocr_marriagecard',
+    'OCRHouseholdCard':'_ocr_householdcard',
+    'OCRHuKouBen':'_ocr_hukouben',
+    'OCRWanShuiPiao':'_ocr_wanshuipiao',
+    'nsfw':None,
+}
+
+__all__ = [i for i in _lazy if i!='nsfw']
+
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError(f"module 'tensormodel' has no attribute '{name}'")
+    if _lazy[name] is None:
+        value = importlib.import_module(f'tensormodel.{name}')
+    else:
+        value = getattr(importlib.import_module(f'tensormodel.{_lazy[name]}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(list(globals())+list(_lazy)))
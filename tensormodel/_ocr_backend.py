@@ -0,0 +1,164 @@
+import os
+import math
+
+import numpy as np
+
+from tensormodel._ocr_engine import _to_3ch, _sorted_boxes, _crop_box
+
+__all__ = ['OCRBackend', 'ONNXBackend']
+
+
+class OCRBackend():
+    """Contract every OCR engine handed to the document classes (`model=` / `ocr=`) follows.
+
+    A backend implements `detect` and `recognize_batch`; `recognize` and `ocr` are derived
+    from them. `ocr` mirrors `paddleocr.PaddleOCR.ocr`, which is what the parsers call:
+
+    - `ocr(array)`: `[[[box, (text, score)], ...]]`, boxes are 4 `[x, y]` points clockwise
+      from top-left, in reading order, lines scoring below `drop_score` dropped.
+    - `ocr(array, rec=False)`: `[[box, ...]]`.
+    - `ocr([crops], det=False)`: `[[(text, score), ...]]`, one entry per crop.
+
+    Arrays are HWC uint8/float32 in the channel order the models were trained on (the
+    parsers pass what `la.image.image_to_array` gives, as with paddle); gray input is repeated to 3
+    channels and an alpha channel is dropped. An empty page is `[None]`.
+    """
+    use_angle_cls = False
+    drop_score = 0.5
+
+    def detect(self, array):
+        """Text line quadrilaterals of `array`, a list of float32 arrays of shape (4, 2)."""
+        raise NotImplementedError
+
+    def recognize_batch(self, arrays):
+        """`(text, score)` for each single-line crop in `arrays`."""
+        raise NotImplementedError
+
+    def recognize(self, array):
+        return self.recognize_batch([array])[0]
+
+    def ocr(self, img, det=True, rec=True, cls=True):
+        if isinstance(img, str):
+            import cv2
+            img = cv2.imread(img)
+        if not det:
+            if not rec:
+                raise NotImplementedError('Angle classification is not supported by this backend.')
+            pages = img if isinstance(img, list) else [img]
+            return [self.recognize_batch([_to_3ch(i) for i in (page if isinstance(page, list) else [page])]) for page in pages]
+        array = _to_3ch(img)
+        boxes = [i[0] for i in _sorted_boxes([(i,) for i in self.detect(array)])]
+        if not boxes:
+            return [None]
+        if not rec:
+            return [[i.tolist() for i in boxes]]
+        texts = self.recognize_batch([_crop_box(array, i) for i in boxes])
+        return [[[i.tolist(), tuple(j)] for i, j in zip(boxes, texts) if j[1]>=self.drop_score]]
+
+
+class ONNXBackend(OCRBackend):
+    """PP-OCR detection (DB) and recognition (CTC) models exported to ONNX, run with ONNX Runtime.
+
+    Args:
+        det_model: path of the exported detection model.
+        rec_model: path of the exported recognition model.
+        rec_char_dict: path of the recognizer's character dictionary, one character per line.
+        threads: intra-op threads, defaults to the number of CPUs.
+    """
+    def __init__(self, det_model, rec_model, rec_char_dict, threads=None, det_limit_side_len=960,
+                 det_db_thresh=0.3, det_db_box_thresh=0.6, det_db_unclip_ratio=1.5,
+                 rec_image_shape=(3, 48, 320), rec_batch_num=6, drop_score=0.5, providers=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads if threads else (os.cpu_count() or 1)
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ['CPUExecutionProvider'] if providers is None else providers
+        self._det = ort.InferenceSession(det_model, options, providers=providers)
+        self._rec = ort.InferenceSession(rec_model, options, providers=providers)
+        with open(rec_char_dict, encoding='utf-8') as f:
+            self._char = ['blank']+[i.strip('\r\n') for i in f]+[' ']
+        self._det_limit_side_len = det_limit_side_len
+        self._det_db_thresh = det_db_thresh
+        self._det_db_box_thresh = det_db_box_thresh
+        self._det_db_unclip_ratio = det_db_unclip_ratio
+        self._rec_image_shape = rec_image_shape
+        self._rec_batch_num = rec_batch_num
+        self.drop_score = drop_score
+        self.config = {'backend':'onnx', 'det_model':det_model, 'rec_model':rec_model, 'rec_char_dict':rec_char_dict,
+                       'det_limit_side_len':det_limit_side_len, 'det_db_thresh':det_db_thresh,
+                       'det_db_box_thresh':det_db_box_thresh, 'det_db_unclip_ratio':det_db_unclip_ratio,
+                       'rec_image_shape':rec_image_shape, 'drop_score':drop_score}
+
+    def detect(self, array):
+        import cv2
+        h, w = array.shape[:2]
+        ratio = min(1, self._det_limit_side_len/max(h, w))
+        resize_h = max(int(round(h*ratio/32)*32), 32)
+        resize_w = max(int(round(w*ratio/32)*32), 32)
+        image = cv2.resize(np.asarray(array, dtype=np.float32), (resize_w, resize_h))
+        image = (image/255.-np.float32([0.485, 0.456, 0.406]))/np.float32([0.229, 0.224, 0.225])
+        image = image.transpose(2, 0, 1)[None].astype(np.float32)
+        pred = self._det.run(None, {self._det.get_inputs()[0].name:image})[0][0, 0]
+        contours = cv2.findContours((pred>self._det_db_thresh).astype(np.uint8), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)[-2]
+        boxes = []
+        for contour in contours[:1000]:
+            box, side = _mini_box(cv2.minAreaRect(contour))
+            if side<3 or _box_score(pred, box)<self._det_db_box_thresh:
+                continue
+            rect = cv2.minAreaRect(box)
+            distance = cv2.contourArea(box)*self._det_db_unclip_ratio/max(cv2.arcLength(box, True), 1e-6)
+            box, side = _mini_box((rect[0], (rect[1][0]+distance*2, rect[1][1]+distance*2), rect[2]))
+            if side<5:
+                continue
+            box[:,0] = np.clip(np.round(box[:,0]/resize_w*w), 0, w-1)
+            box[:,1] = np.clip(np.round(box[:,1]/resize_h*h), 0, h-1)
+            if min(np.linalg.norm(box[0]-box[1]), np.linalg.norm(box[0]-box[3]))>3:
+                boxes.append(box.astype(np.float32))
+        return boxes
+
+    def recognize_batch(self, arrays):
+        import cv2
+        arrays = [_to_3ch(np.asarray(i)) for i in arrays]
+        c, h, w = self._rec_image_shape
+        order = np.argsort([i.shape[1]/max(i.shape[0], 1) for i in arrays])
+        result = [None]*len(arrays)
+        for start in range(0, len(arrays), self._rec_batch_num):
+            index = order[start:start+self._rec_batch_num]
+            max_ratio = max([w/h]+[arrays[i].shape[1]/max(arrays[i].shape[0], 1) for i in index])
+            width = int(h*max_ratio)
+            batch = np.zeros((len(index), c, h, width), dtype=np.float32)
+            for n, i in enumerate(index):
+                resize_w = min(width, int(math.ceil(h*arrays[i].shape[1]/max(arrays[i].shape[0], 1))))
+                image = cv2.resize(np.asarray(arrays[i], dtype=np.float32), (max(resize_w, 1), h))
+                batch[n, :, :, :image.shape[1]] = (image/255.-0.5).transpose(2, 0, 1)/0.5
+            pred = self._rec.run(None, {self._rec.get_inputs()[0].name:batch})[0]
+            for n, i in enumerate(index):
+                result[i] = self._ctc_decode(pred[n])
+        return result
+
+    def _ctc_decode(self, pred):
+        index = pred.argmax(axis=1)
+        prob = pred.max(axis=1)
+        keep = (index!=0)&np.concatenate([[True], index[1:]!=index[:-1]])
+        text = ''.join([self._char[i] for i in index[keep] if i<len(self._char)])
+        return (text, float(prob[keep].mean()) if keep.any() else 0.)
+
+
+def _mini_box(rect):
+    import cv2
+    points = sorted(cv2.boxPoints(rect).tolist(), key=lambda x:x[0])
+    left = points[:2] if points[0][1]<=points[1][1] else points[1::-1]
+    right = points[2:] if points[2][1]<=points[3][1] else points[:1:-1]
+    return np.array([left[0], right[0], right[1], left[1]], dtype=np.float32), min(rect[1])
+
+
+def _box_score(pred, box):
+    import cv2
+    h, w = pred.shape
+    x0, y0 = np.clip(np.floor(box.min(axis=0)).astype(int), 0, [w-1, h-1])
+    x1, y1 = np.clip(np.ceil(box.max(axis=0)).astype(int), 0, [w-1, h-1])
+    mask = np.zeros((y1-y0+1, x1-x0+1), dtype=np.uint8)
+    cv2.fillPoly(mask, (box-[x0, y0]).astype(np.int32)[None], 1)
+    return cv2.mean(pred[y0:y1+1, x0:x1+1], mask)[0]
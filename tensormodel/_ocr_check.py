@@ -0,0 +1,80 @@
+import time
+
+__all__ = ['luhn_valid', 'idcard_check', 'idcard_valid', 'find_idcard']
+
+_idcard_region = {11, 12, 13, 14, 15, 21, 22, 23, 31, 32, 33, 34, 35, 36, 37, 41, 42, 43, 44, 45, 46, 
+                  50, 51, 52, 53, 54, 61, 62, 63, 64, 65, 71, 81, 82, 83}
+_idcard_weight = [pow(2, 17-i, 11) for i in range(17)]
+_idcard_check = '10X98765432'
+_month_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+
+def luhn_valid(number):
+    """True if `number` (a digit string) passes the Luhn checksum used by bank card numbers."""
+    if not number or not number.isdigit():
+        return False
+    total = 0
+    for n, char in enumerate(reversed(number)):
+        d = int(char)
+        if n%2:
+            d = d*2-9 if d>4 else d*2
+        total += d
+    return total%10==0
+
+
+def _date_valid(year, month, day):
+    if not 0<month<13 or day<1:
+        return False
+    return day<=_month_days[month-1]+(month==2 and year%4==0 and (year%100!=0 or year%400==0))
+
+
+def idcard_check(number):
+    """GB 11643 check character for the first 17 digits of a resident ID number."""
+    return _idcard_check[sum([int(number[i])*_idcard_weight[i] for i in range(17)])%11]
+
+
+def idcard_valid(number):
+    """True for an 18-character resident ID number with a known region code, a real birth date
+    not in the future and a matching GB 11643 check character."""
+    if len(number)!=18 or not number[:17].isdigit() or int(number[:2]) not in _idcard_region:
+        return False
+    today = time.localtime()
+    year, month, day = int(number[6:10]), int(number[10:12]), int(number[12:14])
+    if not (1900<year and year*10000+month*100+day<=today.tm_year*10000+today.tm_mon*100+today.tm_mday and _date_valid(year, month, day)):
+        return False
+    return number[17]==idcard_check(number)
+
+
+def find_idcard(text):
+    """Scan a string of digits and 'X' once for 18-character resident ID numbers.
+
+    Returns `(start, True)` for the first window passing `idcard_valid`, else `(start, False)` for
+    the first window with no 'X' before its last character and year (1901 to last year), month and
+    day fields in range, else None. The check sum is rolled from one offset to the next, so no
+    window is sliced or re-summed.
+    """
+    n = len(text)
+    if n<18:
+        return None
+    today = time.localtime()
+    year = today.tm_year
+    date = today.tm_year*10000+today.tm_mon*100+today.tm_mday
+    d = [10 if i=='X' else ord(i)-48 for i in text]
+    shift = pow(2, 18, 11)
+    total = sum([d[i]*_idcard_weight[i] for i in range(17)])%11
+    xs = d[:17].count(10)
+    first = None
+    for i in range(n-17):
+        if not xs:
+            y = d[i+6]*1000+d[i+7]*100+d[i+8]*10+d[i+9]
+            m = d[i+10]*10+d[i+11]
+            day = d[i+12]*10+d[i+13]
+            if (first is None and 1900<y<year and 0<m<13 and 0<day<32):
+                first = i
+            if (d[i]*10+d[i+1] in _idcard_region and 1900<y and y*10000+m*100+day<=date 
+                and _date_valid(y, m, day) and _idcard_check[total]==text[i+17]):
+                return (i, True)
+        if i+18<n:
+            total = (total*2-d[i]*shift+d[i+17]*2)%11
+            xs += (d[i+17]==10)-(d[i]==10)
+    return None if first is None else (first, False)
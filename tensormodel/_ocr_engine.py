@@ -0,0 +1,808 @@
+import os
+import copy
+import time
+import pickle
+import sqlite3
+import hashlib
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+import numpy as np
+import linora as la
+
+
+__all__ = ['get_engine', 'release_engine', 'CachedEngine', 'SQLiteStore']
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class SharedEngine():
+    """Handle on a `paddleocr.PaddleOCR` shared by every document class in the process.
+
+    `ocr` calls are serialized because a paddle predictor must not run concurrently;
+    any other attribute is read from the wrapped engine. Recognition-only batches
+    (`ocr([crops], det=False, cls=False)`) that arrive from other threads while the engine
+    is busy are coalesced into one recognizer call.
+    """
+    def __init__(self, engine, config=None):
+        self.engine = engine
+        self.config = {} if config is None else config
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._leader = False
+
+    def ocr(self, img, det=True, rec=True, cls=True, **kwargs):
+        if not det and rec and not cls and not kwargs and isinstance(img, list) and len(img)==1 and isinstance(img[0], list):
+            return self._recognize(img[0])
+        with self._lock:
+            return self.engine.ocr(img, det=det, rec=rec, cls=cls, **kwargs)
+
+    def _recognize(self, crops):
+        request = {'crops':crops, 'event':threading.Event()}
+        with self._pending_lock:
+            self._pending.append(request)
+            leader = not self._leader
+            self._leader = True
+        if leader:
+            with self._lock:
+                with self._pending_lock:
+                    batch, self._pending = self._pending, []
+                    self._leader = False
+                try:
+                    texts = self.engine.ocr([sum([i['crops'] for i in batch], [])], det=False, cls=False)[0]
+                    n = 0
+                    for i in batch:
+                        i['result'] = [texts[n:n+len(i['crops'])]]
+                        n += len(i['crops'])
+                except Exception as e:
+                    for i in batch:
+                        i['error'] = e
+            for i in batch:
+                i['event'].set()
+        request['event'].wait()
+        if 'error' in request:
+            raise request['error']
+        return request['result']
+
+    def __getattr__(self, name):
+        if name in ['engine', 'config', '_lock', '_pending', '_pending_lock', '_leader']:
+            raise AttributeError(name)
+        return getattr(self.engine, name)
+
+
+class CachedEngine():
+    """Memoizes `ocr` calls of `engine` by the content of their input, so several parsers
+    reading the same image share one OCR pass. Any other attribute is read from `engine`.
+
+    `store` is any mapping, a dict by default or a `SQLiteStore` to keep results across
+    requests and processes. Keys cover the input pixels (so the rotation), the call
+    options, the engine type and its settings (its `config`, or the `args` of a
+    `paddleocr.PaddleOCR`). An engine with neither can only use a dict store, keyed to
+    that engine object.
+    """
+    def __init__(self, engine, store=None, config=None):
+        self.engine = engine
+        self.store = {} if store is None else store
+        self.config = getattr(engine, 'config', None) if config is None else config
+        self._engine_key = _engine_key(engine)
+        if self._engine_key is None:
+            if not isinstance(self.store, dict):
+                raise TypeError(f'`{type(engine).__name__}` has no `config` or `args` to key a shared cache on.')
+            self._engine_key = (type(engine).__qualname__, id(engine))
+
+    def ocr(self, img, det=True, rec=True, cls=True, **kwargs):
+        key = content_key(img, det, rec, cls, self._engine_key, **kwargs)
+        copied = not isinstance(self.store, SQLiteStore)
+        try:
+            result = self.store[key]
+            return copy.deepcopy(result) if copied else result
+        except KeyError:
+            pass
+        result = self.engine.ocr(img, det=det, rec=rec, cls=cls, **kwargs)
+        self.store[key] = result
+        return copy.deepcopy(result) if copied else result
+
+    def __getattr__(self, name):
+        if name in ['engine', 'store', 'config', '_engine_key']:
+            raise AttributeError(name)
+        return getattr(self.engine, name)
+
+
+class SQLiteStore():
+    """Mapping kept in a SQLite file, evicting least recently used entries beyond `max_size` bytes.
+
+    The total size is kept in a `meta` row, so a write only walks the oldest entries it evicts.
+    """
+    def __init__(self, path, max_size=2**30):
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, size INTEGER, atime REAL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_atime ON cache (atime)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)')
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('size', (SELECT COALESCE(SUM(size), 0) FROM cache))")
+
+    def __getitem__(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM cache WHERE key=?', (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            self._conn.execute('UPDATE cache SET atime=? WHERE key=?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def __setitem__(self, key, value):
+        value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute('SELECT size FROM cache WHERE key=?', (key,)).fetchone()
+                self._conn.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', (key, value, len(value), time.time()))
+                self._conn.execute("UPDATE meta SET value=value+? WHERE name='size'", (len(value)-(row[0] if row else 0),))
+                size = self._conn.execute("SELECT value FROM meta WHERE name='size'").fetchone()[0]
+                if size>self.max_size:
+                    count = 0
+                    cursor = self._conn.execute('SELECT size FROM cache ORDER BY atime')
+                    for (i,) in cursor:
+                        if size<=self.max_size:
+                            break
+                        size -= i
+                        count += 1
+                    cursor.close()
+                    self._conn.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY atime LIMIT ?)', (count,))
+                    self._conn.execute("UPDATE meta SET value=? WHERE name='size'", (size,))
+                self._conn.execute('COMMIT')
+            except:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM cache WHERE key=?', (key,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _engine_key(engine):
+    config = getattr(engine, 'config', None)
+    if not config and isinstance(engine, SharedEngine):
+        return _engine_key(engine.engine)
+    if config is None and hasattr(getattr(engine, 'args', None), '__dict__'):
+        config = vars(engine.args)
+    if config is None:
+        return None
+    return (f'{type(engine).__module__}.{type(engine).__qualname__}', sorted([(i, repr(j)) for i, j in config.items()]))
+
+
+def content_key(img, *args, **kwargs):
+    """Digest of an OCR input (arrays, nested lists of arrays, paths or bytes) plus call options."""
+    key = hashlib.sha1(repr((args, sorted(kwargs.items()))).encode())
+    def update(x):
+        if isinstance(x, np.ndarray):
+            key.update(repr((x.shape, x.dtype.str)).encode())
+            key.update(np.ascontiguousarray(x).data)
+        elif isinstance(x, (list, tuple)):
+            key.update(f'[{len(x)}'.encode())
+            for i in x:
+                update(i)
+        elif isinstance(x, str):
+            with open(x, 'rb') as f:
+                key.update(f.read())
+        elif isinstance(x, (bytes, bytearray, memoryview)):
+            key.update(x)
+        else:
+            key.update(repr(x).encode())
+    update(img)
+    return key.hexdigest()
+
+
+def get_engine(backend='paddle', cache=None, cache_size=2**30, **kwargs):
+    """Shared OCR engine for a backend config, loaded on first use.
+
+    `backend='paddle'` builds `paddleocr.PaddleOCR(**kwargs)`, `backend='onnx'` builds
+    `ONNXBackend(**kwargs)`. With `cache` (a SQLite file path) the engine is wrapped in a
+    `CachedEngine`, so repeated images skip OCR; the file is LRU-bounded to `cache_size` bytes.
+    Every call takes a reference; give it back with `release_engine`.
+    """
+    if backend not in ['paddle', 'onnx']:
+        raise ValueError("`backend` must be one of ['paddle', 'onnx'].")
+    if backend=='paddle':
+        kwargs = {'show_log':False, **kwargs}
+    key = tuple(sorted([(i, repr(j)) for i, j in kwargs.items()]+[('backend', backend)]))
+    with _engines_lock:
+        if key not in _engines:
+            if backend=='paddle':
+                import paddleocr
+                engine = paddleocr.PaddleOCR(**kwargs)
+            else:
+                from tensormodel._ocr_backend import ONNXBackend
+                engine = ONNXBackend(**kwargs)
+            _engines[key] = [SharedEngine(engine, {'backend':backend, **kwargs}), 0]
+        _engines[key][1] += 1
+        if cache is None:
+            return _engines[key][0]
+        engine = _engines[key][0]
+        key = key+(('cache', os.path.abspath(cache)),)
+        if key not in _engines:
+            _engines[key] = [CachedEngine(engine, SQLiteStore(cache, cache_size), {**engine.config, 'cache':cache, 'cache_size':cache_size}), 0]
+        _engines[key][1] += 1
+        return _engines[key][0]
+
+
+def release_engine(engine):
+    """Drop one reference taken by `get_engine`, unloading the engine with the last one.
+
+    Returns the number of references left.
+    """
+    with _engines_lock:
+        return _release(engine)
+
+
+def _release(engine):
+    for key, value in list(_engines.items()):
+        if value[0] is engine:
+            value[1] -= 1
+            if value[1]<=0:
+                del _engines[key]
+            if isinstance(engine, CachedEngine):
+                if value[1]<=0:
+                    engine.store.close()
+                _release(engine.engine)
+            return max(value[1], 0)
+    return 0
+
+
+def stateless(predict):
+    """Run `predict` on a shallow copy of the instance, so per-request attributes
+    (`_image`, `_info`, `_axis`, `_result`, ...) never live on the shared object and one
+    instance with its one loaded model can serve concurrent requests.
+
+    The copy is dropped once `predict` returns; `draw_mask` takes the image and the returned
+    result instead of reading the last request.
+    """
+    @functools.wraps(predict)
+    def wrapper(self, *args, **kwargs):
+        return predict(copy.copy(self), *args, **kwargs)
+    return wrapper
+
+
+class OCRMixin():
+    """Batch and async entry points shared by the document classes, which define a
+    `@stateless` `predict`."""
+    def predict_batch(self, images, workers=None, chunksize=1, **kwargs):
+        """`predict` for every image on a process pool, see `run_batch`."""
+        return run_batch(self, images, workers, chunksize, **kwargs)
+
+    async def apredict(self, image, timeout=None, **kwargs):
+        """Await `predict` run on a thread pool, see `run_async`."""
+        return await run_async(self, image, timeout, **kwargs)
+
+
+def run_batch(instance, images, workers=None, chunksize=1, **kwargs):
+    """`instance.predict(image, **kwargs)` for every image on a process pool, in input order.
+
+    Each worker rebuilds the instance once with its own engine (same config when the instance
+    uses a shared engine). File-like inputs are read into bytes in the parent. A failing image,
+    including one that cannot be sent to a worker, gives `{'data':'', 'angle':0, 'error':...}`
+    instead of aborting the batch. Raises TypeError up front if the instance state cannot be
+    pickled.
+    """
+    tasks = []
+    for image in images:
+        try:
+            tasks.append(_batch_input(image))
+        except Exception as e:
+            tasks.append(e)
+    state = dict(instance.__dict__)
+    attr = [i for i in ['_model', 'ocr'] if i in state]
+    attr = attr[0] if attr else None
+    engine = state.pop(attr) if attr else None
+    if isinstance(engine, (SharedEngine, CachedEngine)) and engine.config is not None:
+        engine = engine.config
+    try:
+        pickle.dumps((type(instance), state, attr, engine))
+    except Exception as e:
+        raise TypeError(f'`{type(instance).__name__}` cannot be sent to worker processes: {e}') from e
+    with ProcessPoolExecutor(workers, initializer=_batch_init, initargs=(type(instance), state, attr, engine)) as executor:
+        result = iter(executor.map(_batch_predict, [(i, kwargs) for i in tasks if not isinstance(i, Exception)], chunksize=chunksize))
+        return [_batch_error(i) if isinstance(i, Exception) else next(result) for i in tasks]
+
+
+async def run_async(instance, image, timeout=None, executor=None, **kwargs):
+    """Await `instance.predict(image, **kwargs)` run on a bounded thread pool.
+
+    Raises `asyncio.TimeoutError` after `timeout` seconds. Cancelling (or timing out) drops a
+    request that has not started yet; one already running finishes in the background.
+    """
+    future = asyncio.get_running_loop().run_in_executor(_get_executor() if executor is None else executor,
+                                                        functools.partial(instance.predict, image, **kwargs))
+    return await asyncio.wait_for(future, timeout)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(min(8, (os.cpu_count() or 1)+2), thread_name_prefix='tensormodel')
+        return _executor
+
+
+_batch_instance = None
+
+
+def _batch_init(cls, state, attr, engine):
+    global _batch_instance, _engines_lock, _executor, _executor_lock
+    _engines_lock = threading.Lock()
+    _executor = None
+    _executor_lock = threading.Lock()
+    _engines.clear()
+    instance = cls.__new__(cls)
+    instance.__dict__.update(state)
+    if attr is not None:
+        instance.__dict__[attr] = get_engine(**engine) if isinstance(engine, dict) else engine
+    _batch_instance = instance
+
+
+def _batch_input(image):
+    if isinstance(image, (str, bytes, np.ndarray)):
+        return image
+    if hasattr(image, 'getbuffer'):
+        return bytes(image.getbuffer()[image.tell():])
+    if hasattr(image, 'read'):
+        return image.read()
+    if isinstance(image, (bytearray, memoryview)):
+        return bytes(image)
+    pickle.dumps(image)
+    return image
+
+
+def _batch_predict(task):
+    image, kwargs = task
+    try:
+        return _batch_instance.predict(image, **kwargs)
+    except Exception as e:
+        return _batch_error(e)
+
+
+def _batch_error(e):
+    return {'data':'', 'angle':0, 'error':f'{type(e).__name__}: {e}'}
+
+
+def read_image(image, min_side=None, bgr=False):
+    """Decode an image to an RGB image, returning `(image, scale)`.
+
+    `image` is a path, encoded bytes (`bytes`, `bytearray`, `memoryview` or a file-like
+    object), an HWC uint8 `np.ndarray` (RGB, or BGR with `bgr=True`) or a PIL image, which
+    is returned as is. Encoded bytes are decoded in memory without a copy of the buffer.
+
+    With `min_side`, large files are decoded at 1/2, 1/4 or 1/8 resolution (DCT-domain
+    scaling for JPEG) while the long side stays at least `min_side`; `scale` is the
+    full-resolution size over the decoded one, for mapping boxes back with `scale_axis`.
+    The full-resolution pixels are not read again: the parsers' field retry crops are cut from
+    this reduced decode, so a `decode_side` below the parser's `side_range` also lowers the
+    resolution those retries see.
+    """
+    from PIL import Image
+    if isinstance(image, Image.Image):
+        return image, 1
+    if isinstance(image, np.ndarray):
+        if image.ndim==3 and bgr:
+            image = image[:,:,2::-1] if image.shape[2]>=3 else image
+        elif image.ndim==3 and image.shape[2]==1:
+            image = image[:,:,0]
+        return la.image.color_convert(Image.fromarray(np.ascontiguousarray(image, dtype=np.uint8))), 1
+    if isinstance(image, str):
+        buffer = None
+    elif hasattr(image, 'getbuffer'):
+        buffer = image.getbuffer()[image.tell():]
+    elif hasattr(image, 'read'):
+        buffer = image.read()
+    else:
+        buffer = image
+
+    import io
+    factor = 1
+    if min_side:
+        with Image.open(image if buffer is None else io.BytesIO(buffer)) as f:
+            size = max(f.size)
+        while factor<8 and size/(factor*2)>=min_side:
+            factor *= 2
+    if buffer is None and factor==1:
+        return la.image.color_convert(la.image.read_image(image)), 1
+    import cv2
+    flag = {1:cv2.IMREAD_COLOR, 2:cv2.IMREAD_REDUCED_COLOR_2, 4:cv2.IMREAD_REDUCED_COLOR_4, 8:cv2.IMREAD_REDUCED_COLOR_8}[factor]
+    if buffer is None:
+        array = cv2.imread(image, flag|cv2.IMREAD_IGNORE_ORIENTATION)
+    else:
+        array = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), flag|cv2.IMREAD_IGNORE_ORIENTATION)
+    if array is None:
+        return la.image.color_convert(la.image.read_image(image) if buffer is None else Image.open(io.BytesIO(buffer))), 1
+    image = la.image.array_to_image(cv2.cvtColor(array, cv2.COLOR_BGR2RGB))
+    return image, (size/max(image.size) if factor>1 else 1)
+
+
+def fit_side(image, side_range=None):
+    """Resize `image` so its long side lies in `side_range`, `(min, max)`, returning `(image, scale)`.
+
+    `scale` is the input size over the resized one, as for `read_image`.
+    """
+    if not side_range:
+        return image, 1
+    size = max(image.size)
+    target = min(max(size, side_range[0]), side_range[1])
+    if target==size:
+        return image, 1
+    image = la.image.resize(image, (max(int(round(image.size[0]*target/size)), 1), max(int(round(image.size[1]*target/size)), 1)))
+    return image, size/max(image.size)
+
+
+def scale_axis(axis, scale):
+    """Multiply every coordinate in a (nested) axis dict/list by `scale`."""
+    if scale==1:
+        return axis
+    if isinstance(axis, dict):
+        return {i:scale_axis(j, scale) for i, j in axis.items()}
+    if isinstance(axis, (list, tuple)):
+        return type(axis)([scale_axis(i, scale) for i in axis])
+    if isinstance(axis, (int, np.integer)):
+        return int(round(axis*scale))
+    if isinstance(axis, (float, np.floating)):
+        return axis*scale
+    return axis
+
+
+def rotate_image(image, angle):
+    """`la.image.rotate(image, angle, expand=True)`, with right angles done as a plain transpose."""
+    if angle%90:
+        return la.image.rotate(image, angle, expand=True)
+    k = int(angle)//90%4
+    if k==0:
+        return image
+    from PIL import Image
+    return image.transpose([None, Image.Transpose.ROTATE_90, Image.Transpose.ROTATE_180, Image.Transpose.ROTATE_270][k])
+
+
+def image_array(image, angle=0, gray=False):
+    """uint8 array of `image` (PIL image or array) rotated counter-clockwise by `angle`.
+
+    Right angles are `np.rot90` views; `gray` gives a single-channel (H, W) array.
+    """
+    array = image if isinstance(image, np.ndarray) else np.asarray(image)
+    if gray and array.ndim==3:
+        import cv2
+        array = cv2.cvtColor(np.ascontiguousarray(array), cv2.COLOR_RGB2GRAY)
+    if angle%90:
+        from PIL import Image
+        return np.asarray(la.image.rotate(Image.fromarray(array), angle, expand=True))
+    return np.rot90(array, int(angle)//90%4)
+
+
+def crop_array(array, box):
+    """View of the xyxy `box` of `array`, clipped to the image."""
+    h, w = array.shape[:2]
+    x0, y0, x1, y1 = [int(round(i)) for i in box]
+    return array[min(max(y0, 0), h):min(max(y1, 0), h), min(max(x0, 0), w):min(max(x1, 0), w)]
+
+
+def crop_variants(array, box, brightness=0.8):
+    """The crop retry variants of `box`: as is, grayscale, and darkened by `brightness`."""
+    crop = crop_array(array, box)
+    if not crop.size:
+        return [crop, crop, crop]
+    return [crop, image_array(crop, gray=True), np.clip(crop*np.float32(brightness), 0, 255).astype(np.uint8)]
+
+
+def _probe_angle(model, array, boxes, angles, max_lines=8):
+    """`(ordered angles, conclusive)` from text lines `boxes` already detected on `array`."""
+    angles = list(angles)
+    lines = []
+    for box in boxes if boxes else []:
+        w = np.linalg.norm(box[1]-box[0])
+        h = np.linalg.norm(box[2]-box[1])
+        if max(w, h)>min(w, h)*2:
+            lines.append((box, w>h, max(w, h)))
+    if not lines:
+        return angles, False
+    horizontal = sum([1 for i in lines if i[1]])/len(lines)>=0.5
+    pair = [0, 180] if horizontal else [90, 270]
+    conclusive = horizontal
+
+    if getattr(model, 'use_angle_cls', False):
+        crops = []
+        for box, _, _ in sorted([i for i in lines if i[1]==horizontal], key=lambda x:x[2])[-max_lines:]:
+            x0, y0 = np.maximum(np.floor(box.min(axis=0)), 0).astype(int)
+            x1, y1 = np.ceil(box.max(axis=0)).astype(int)
+            crop = array[y0:y1, x0:x1]
+            if crop.size:
+                crops.append(crop if horizontal else np.ascontiguousarray(np.rot90(crop)))
+        try:
+            cls = model.ocr([crops], det=False, rec=False, cls=True)[0] if crops else []
+            if sum([i[1] for i in cls if '180' in i[0]])>sum([i[1] for i in cls if '180' not in i[0]]):
+                pair = pair[::-1]
+            conclusive = len(cls)>0
+        except:
+            pass
+    return [i for i in pair if i in angles]+[i for i in angles if i not in pair], conclusive
+
+
+def ocr_direction(model, image, angles=(0, 90, 270, 180), gray=False):
+    """Yield `(angle, rotate, ocr result)` for each candidate angle in probed order.
+
+    `rotate()` returns the image rotated by `angle`; it is only transposed when called, so
+    callers rotate the one angle they accept.
+
+    Text lines are detected once on the unrotated image; the same boxes give the orientation
+    probe, serve the grayscale variant and are mapped into each candidate's frame, so only the
+    recognizer runs per angle. A conclusive probe gets its angle recognized first; all other
+    candidates share one batched recognizer call, which is only made if the loop moves on from
+    the first one.
+    """
+    array = image_array(image)
+    arrays = [array, image_array(array, gray=True)] if gray else [array]
+    pages = [_to_3ch(i) for i in arrays]
+    try:
+        boxes = _detect(model, pages[0])
+        angles, conclusive = _probe_angle(model, pages[0], boxes, angles)
+        boxes = [boxes]*len(pages)
+    except:
+        angles, conclusive = list(angles), False
+        boxes = None
+    modes = [0, 1] if gray else [0]
+    items = [(angle, i) for angle in angles for i in modes]
+    def to_array(angle, i):
+        return image_array(arrays[i], angle)
+
+    groups = [[i for i in items if i[0]==angles[0]], [i for i in items if i[0]!=angles[0]]] if conclusive else [items]
+    for group in groups:
+        try:
+            results = _recognize(model, [(pages[i], boxes[i], angle) for angle, i in group])
+        except:
+            results = None
+        for n, (angle, i) in enumerate(group):
+            yield angle, functools.partial(rotate_image, image, angle), model.ocr(to_array(angle, i), cls=False) if results is None else results[n]
+
+
+def ocr_crops(model, arrays, line_height=None):
+    """Re-read field crops, returning one `model.ocr`-style result per array.
+
+    Crops no taller than one and a half text lines skip detection and go to the recognizer
+    together in a single batch; taller (multi-line) crops still get a full OCR pass each.
+    """
+    result = [None if i.size else [[]] for i in arrays]
+    single = [n for n, i in enumerate(arrays) if _single_line(i, line_height)]
+    try:
+        texts = model.ocr([[_to_3ch(arrays[n]) for n in single]], det=False, cls=False)[0] if single else []
+        drop_score = getattr(model, 'drop_score', 0.5)
+        for n, text in zip(single, texts):
+            h, w = arrays[n].shape[:2]
+            result[n] = [[[[[0, 0], [w, 0], [w, h], [0, h]], tuple(text)]] if text[1]>=drop_score else []]
+    except:
+        pass
+    for n, i in enumerate(result):
+        if i is None:
+            result[n] = _ocr_crop(model, arrays[n])
+    return result
+
+
+def ocr_fields(model, crops, line_height=None, validate=None, workers=None):
+    """Read field crops given as a list of `((field, aug), array)`, returning `{(field, aug): result}`.
+
+    Without `workers` the single-line crops go through `ocr_crops` at once, while a multi-line
+    crop is only read when its key is first looked up, so a caller that stops at the first
+    variant that passes never pays for the later ones. With `workers` each variant runs on a
+    thread pool, and once a variant of a field passes `validate[field]` (called with the
+    recognized text) the later variants of that field which have not started are cancelled.
+    """
+    if not workers:
+        result = _LazyFields(model, {key:array for key, array in crops if array.size and not _single_line(array, line_height)})
+        single = [i for i in crops if i[0] not in result._pending]
+        result.update(zip([i[0] for i in single], ocr_crops(model, [i[1] for i in single], line_height)))
+        return result
+    validate = {} if validate is None else validate
+    result = {}
+    with ThreadPoolExecutor(workers) as executor:
+        futures = {executor.submit(ocr_crops, model, [array], line_height):key for key, array in crops}
+        for future in as_completed(futures):
+            key = futures[future]
+            if future.cancelled():
+                continue
+            result[key] = future.result()[0]
+            if key[0] in validate and validate[key[0]](''.join([i[1][0] for i in (result[key][0] if result[key][0] else [])])):
+                for i in futures:
+                    if futures[i][0]==key[0] and futures[i][1]>key[1]:
+                        i.cancel()
+    return result
+
+
+class _LazyFields(dict):
+    """`ocr_fields` result that runs the full OCR of a multi-line crop on first lookup."""
+    def __init__(self, model, pending):
+        super().__init__()
+        self._model = model
+        self._pending = pending
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self._pending
+
+    def __missing__(self, key):
+        self[key] = _ocr_crop(self._model, self._pending.pop(key))
+        return self[key]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+def text_height(result):
+    """Median text-line height of a `model.ocr` result, None if it has no lines."""
+    height = [min(np.linalg.norm(np.subtract(i[0][3], i[0][0])), np.linalg.norm(np.subtract(i[0][1], i[0][0]))) for i in (result[0] if result and result[0] else [])]
+    return float(np.median(height)) if height else None
+
+
+def line_geometry(lines, fields=None):
+    """Geometry of all OCR `lines` (`[[box, (text, score)], ...]`) at once, as one (N, 4, 2) array.
+
+    Returns `(geometry, overlap)`. `geometry` maps 'h' and 'w' (mean side lengths) and 'x' and
+    'y' (top-left extent) to one value per line. `overlap` maps each name of `fields` (xyxy
+    boxes) to `(h1, w1)`, the vertical and horizontal overlap of every line with that box.
+    """
+    boxes = np.array([i[0] for i in lines] if lines else [], dtype=np.float64).reshape(-1, 4, 2)
+    x0 = np.minimum(boxes[:,0,0], boxes[:,3,0])
+    y0 = np.minimum(boxes[:,0,1], boxes[:,1,1])
+    x1 = np.maximum(boxes[:,1,0], boxes[:,2,0])
+    y1 = np.maximum(boxes[:,3,1], boxes[:,2,1])
+    geometry = {'h':((boxes[:,3,1]+boxes[:,2,1]-boxes[:,1,1]-boxes[:,0,1])/2).tolist(),
+                'w':((boxes[:,1,0]+boxes[:,2,0]-boxes[:,0,0]-boxes[:,3,0])/2).tolist(),
+                'x':x0.tolist(), 'y':y0.tolist()}
+    names = [i for i in fields if len(fields[i])==4 and None not in fields[i]] if fields else []
+    if not names:
+        return geometry, {}
+    field = np.array([fields[i] for i in names], dtype=np.float64)
+    h1 = np.minimum(y1[:,None], field[:,3])-np.maximum(y0[:,None], field[:,1])
+    w1 = np.minimum(x1[:,None], field[:,2])-np.maximum(x0[:,None], field[:,0])
+    return geometry, {i:(h1[:,n].tolist(), w1[:,n].tolist()) for n, i in enumerate(names)}
+
+
+def field_overlaps(lines, fields, cell=None):
+    """For each OCR line, `[(name, h1, w1), ...]` for the `fields` (xyxy boxes) it overlaps.
+
+    `h1`/`w1` are as in `line_geometry`, pairs that do not overlap on both axes are left out
+    and names keep the order of `fields`. Fields are bucketed once into a uniform grid of
+    `cell` pixels (default: the median short side of the fields), so each line is only tested
+    against the fields sharing a cell with it.
+    """
+    names = [i for i in fields if len(fields[i])==4 and None not in fields[i]]
+    if not names or not lines:
+        return [[] for i in (lines if lines else [])]
+    field = np.array([fields[i] for i in names], dtype=np.float64)
+    if cell is None:
+        cell = np.median(np.minimum(field[:,2]-field[:,0], field[:,3]-field[:,1]))
+    cell = max(float(cell), 1.)
+    grid = {}
+    for n, (x0, y0, x1, y1) in enumerate((field//cell).astype(int).tolist()):
+        for cx in range(x0, x1+1):
+            for cy in range(y0, y1+1):
+                grid.setdefault((cx, cy), []).append(n)
+    boxes = np.array([i[0] for i in lines], dtype=np.float64).reshape(-1, 4, 2)
+    extent = np.stack([np.minimum(boxes[:,0,0], boxes[:,3,0]), np.minimum(boxes[:,0,1], boxes[:,1,1]),
+                       np.maximum(boxes[:,1,0], boxes[:,2,0]), np.maximum(boxes[:,3,1], boxes[:,2,1])], axis=1)
+    result = []
+    for (x0, y0, x1, y1), (cx0, cy0, cx1, cy1) in zip(extent.tolist(), (extent//cell).astype(int).tolist()):
+        near = set()
+        for cx in range(cx0, cx1+1):
+            for cy in range(cy0, cy1+1):
+                near.update(grid.get((cx, cy), ()))
+        line = []
+        for n in sorted(near):
+            h1 = min(y1, field[n,3])-max(y0, field[n,1])
+            w1 = min(x1, field[n,2])-max(x0, field[n,0])
+            if h1>0 and w1>0:
+                line.append((names[n], float(h1), float(w1)))
+        result.append(line)
+    return result
+
+
+def rotate_boxes(boxes, angle, size):
+    """Map quadrilaterals on an image of `size` (w, h) into its frame after
+    `la.image.rotate(image, angle, expand=True)`; `angle` must be a multiple of 90.
+    Points keep the clockwise order starting top-left.
+    """
+    k = int(angle)//90%4
+    if angle%90:
+        raise ValueError('`angle` must be a multiple of 90.')
+    w, h = size
+    result = []
+    for box in boxes:
+        box = np.array(box, dtype=np.float32)
+        x, y = box[:,0], box[:,1]
+        if k==1:
+            box = np.stack([y, w-x], axis=1)
+        elif k==2:
+            box = np.stack([w-x, h-y], axis=1)
+        elif k==3:
+            box = np.stack([h-y, x], axis=1)
+        result.append(np.roll(box, -k, axis=0))
+    return result
+
+
+def _detect(model, array):
+    box = model.ocr(array, rec=False, cls=False)[0]
+    box = [np.array(i, dtype=np.float32) for i in (box if box else [])]
+    return [i for i in box if min(np.linalg.norm(i[0]-i[1]), np.linalg.norm(i[0]-i[3]))>=1]
+
+
+def _recognize(model, tasks):
+    """`tasks` is a list of (array, boxes detected on it, angle); one recognizer call for all."""
+    lines = []
+    crops = []
+    for array, box, angle in tasks:
+        k = int(angle)//90%4
+        line = _sorted_boxes(list(zip(rotate_boxes(box, angle, (array.shape[1], array.shape[0])), [np.roll(i, -k, axis=0) for i in box])))
+        lines.append([i[0] for i in line])
+        crops += [_crop_box(array, i[1]) for i in line]
+    texts = model.ocr([crops], det=False, cls=False)[0] if crops else []
+    drop_score = getattr(model, 'drop_score', 0.5)
+    result = []
+    n = 0
+    for line in lines:
+        text = texts[n:n+len(line)]
+        n += len(line)
+        result.append([[[i.tolist(), tuple(j)] for i, j in zip(line, text) if j[1]>=drop_score]])
+    return result
+
+
+def _single_line(array, line_height):
+    return array.size>0 and (line_height is None or array.shape[0]<=line_height*1.5)
+
+
+def _ocr_crop(model, array):
+    try:
+        return model.ocr(array, cls=False)
+    except:
+        return [[]]
+
+
+def _to_3ch(array):
+    """HWC array with 3 channels: gray and 1-channel input is repeated, an alpha channel dropped."""
+    if array.ndim==2:
+        array = array[:,:,None]
+    if array.shape[2]==1:
+        array = np.concatenate([array]*3, axis=2)
+    return np.ascontiguousarray(array[:,:,:3]) if array.shape[2]>3 else array
+
+
+def _sorted_boxes(lines):
+    lines = sorted(lines, key=lambda x:(x[0][0][1], x[0][0][0]))
+    for i in range(len(lines)-1):
+        for j in range(i, -1, -1):
+            if abs(lines[j+1][0][0][1]-lines[j][0][0][1])<10 and lines[j+1][0][0][0]<lines[j][0][0][0]:
+                lines[j], lines[j+1] = lines[j+1], lines[j]
+            else:
+                break
+    return lines
+
+
+def _crop_box(array, box):
+    import cv2
+    w = int(max(np.linalg.norm(box[0]-box[1]), np.linalg.norm(box[2]-box[3])))
+    h = int(max(np.linalg.norm(box[0]-box[3]), np.linalg.norm(box[1]-box[2])))
+    matrix = cv2.getPerspectiveTransform(box, np.float32([[0, 0], [w, 0], [w, h], [0, h]]))
+    crop = cv2.warpPerspective(array, matrix, (w, h), borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if crop.shape[0]/crop.shape[1]>=1.5:
+        crop = np.rot90(crop)
+    return crop
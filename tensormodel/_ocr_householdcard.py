@@ -1,15 +1,15 @@
 from collections import defaultdict
 
-import cv2
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, stateless, OCRMixin, image_array, rotate_image, read_image
+
 __all__ = ['OCRHouseholdCard']
 
 
-class OCRHouseholdCard():
+class OCRHouseholdCard(OCRMixin):
     def __init__(self, ocr=None):
-        self.ocr = paddleocr.PaddleOCR(show_log=False) if ocr is None else ocr
+        self.ocr = get_engine() if ocr is None else ocr
         self._keys = []
         self._char_household_type = ['户别']
         self._char_household_name = ['户主姓名', '户生姓名']
@@ -18,19 +18,21 @@ class OCRHouseholdCard():
         self._char_register_name = ['姓名']
 #         self._char_number = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
         
-    def predict(self, image):
+    @stateless
+    def predict(self, image, bgr=False):
         self._axis = None
         self._error = 'ok'
         self._angle = -1
         self._mode = ''
         if isinstance(image, str):
+            import cv2
             self._image = cv2.imread(image)
             self._image = cv2.cvtColor(self._image, cv2.COLOR_BGR2RGB)
             self._image = la.image.array_to_image(self._image)
 #             image = la.image.read_image(image)
 #             self._image = la.image.color_convert(image)
         else:
-            self._image = image
+            self._image = read_image(image, bgr=bgr)[0]
         self._direction_transform(self._image)
         if isinstance(self._info, str):
             self._direction_transform(la.image.enhance_brightness(self._image, 0.8))
@@ -65,18 +67,11 @@ class OCRHouseholdCard():
         
     def _direction_transform(self, image):
         if self._angle!=-1:
-            image1 = la.image.rotate(image, self._angle, expand=True)
-            image1 = la.image.image_to_array(image1)
+            image1 = image_array(image, self._angle)
             self._result = self.ocr.ocr(image1, cls=False)
         else:
             self._result = []
-            for angle in [0, 90, 180, 270]:
-                if angle>0:
-                    image1 = la.image.rotate(image, angle, expand=True)
-                    image1 = la.image.image_to_array(image1)
-                else:
-                    image1 = la.image.image_to_array(image)
-                result = self.ocr.ocr(image1, cls=False)
+            for angle, _, result in ocr_direction(self.ocr, image, [0, 90, 180, 270]):
                 
                 rank = [0,0,0,0,0]
                 for r, i in enumerate(result[0], start=1):
@@ -598,10 +593,11 @@ class OCRHouseholdCard():
         
     
     def draw_mask(self, image=None, axis=None, box_axis='all', mask_axis=None):
-        if image is None:
-            image = self._image.copy()
-        angle = self._angle if axis is None else axis['angle']
-        axis = self._axis if axis is None else axis['axis']
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = read_image(image)[0].copy()
+        angle = axis['angle']
+        axis = axis['axis']
 
         if box_axis=='all':
             box_axis = self._keys
@@ -636,7 +632,7 @@ class OCRHouseholdCard():
 
         try:
             if angle>0:
-                image = la.image.rotate(image, angle, expand=True)
+                image = rotate_image(image, angle)
             t = [la.image.box_convert(axis[i], 'xyxy', 'axis') for i in box_axis if i not in mask_axis and i in axis]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
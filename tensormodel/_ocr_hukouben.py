@@ -1,19 +1,23 @@
 import time
 
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, stateless, OCRMixin, read_image, fit_side, scale_axis, image_array, crop_array, rotate_image, line_geometry
+from tensormodel._ocr_match import KeywordMatcher
+
 __all__ = ['OCRHuKouBen']
 
 
-class OCRHuKouBen():
-    def __init__(self, model=True, name_list=None):
+class OCRHuKouBen(OCRMixin):
+    def __init__(self, model=True, name_list=None, decode_side=None, side_range=(960, 2400)):
         if model==True:
-            self._model = paddleocr.PaddleOCR(show_log=False)
+            self._model = get_engine()
         elif model:
             self._model = model
         else:
             self._model = None
+        self._decode_side = decode_side
+        self._side_range = side_range
         self._keys_shouye = ['household_type', 'household_name', 'household_id', 'household_address']
         self._keys_neirong = ['register_name', 'register_relation', 'register_previous_name', 'register_sex', 
                               'register_birthplace', 'register_nation', 'register_nativeplace', 'register_born', 
@@ -34,16 +38,17 @@ class OCRHuKouBen():
         self._char_household_id = ['户号']
         self._char_household_address = ['住址']
         self._char_register_name = ['姓名']
+        self._matcher = KeywordMatcher({i:getattr(self, '_char_'+i) for i in ['household_name']})
         
-    def predict(self, image, axis=False, model=None):
+    @stateless
+    def predict(self, image, axis=False, model=None, bgr=False):
         self._show_axis = axis
         self._info = '图片模糊或非户口本图片'
         self._error = '图片模糊或非户口本图片'
         
-        if isinstance(image, str):
-            self._image = la.image.color_convert(la.image.read_image(image))
-        else:
-            self._image = image
+        self._source, self._source_scale = read_image(image, self._decode_side, bgr)
+        self._image, self._scale = fit_side(self._source, self._side_range)
+        self._scale *= self._source_scale
         self._fit_direction(self._model if model is None else model)
         if isinstance(self._info, str):
             if self._show_axis:
@@ -56,11 +61,12 @@ class OCRHuKouBen():
         error_list = [i for i in self._info if '图片模糊' in self._info[i]]
         if error_list:
             self._result_crop = []
+            array = image_array(self._image)
             for i in error_list:
                 if i not in self._axis:
                     continue
-                image = la.image.crop(self._image, self._axis[i])
-                t = (self._model if model is None else model).ocr(la.image.image_to_array(image), cls=False)
+                image = crop_array(array, self._axis[i])
+                t = (self._model if model is None else model).ocr(image, cls=False)
                 if t[0]:
                     for j in t[0]:
                         self._result_crop.append([[self._axis[i][:2], [self._axis[i][2], self._axis[i][1]], 
@@ -73,14 +79,12 @@ class OCRHuKouBen():
         self._error = '图片模糊' if [1 for i in self._info if '图片模糊' in self._info[i]] else 'ok'
         self._info = {i:('' if '图片模糊' in j else j) for i,j in self._info.items()}
         if self._show_axis:
-            return {'data':self._info, 'axis':self._axis, 'angle':self._angle, 'error':self._error}
+            return {'data':self._info, 'axis':scale_axis(self._axis, self._scale), 'angle':self._angle, 'error':self._error}
         else:
             return {'data':self._info, 'angle':self._angle, 'error':self._error}
         
     def _fit_direction(self, model):
-        for angle in [0, 90, 270, 180]:
-            image = la.image.rotate(self._image, angle, expand=True)
-            self._result = model.ocr(la.image.image_to_array(image), cls=False)
+        for angle, image, self._result in ocr_direction(model, self._image):
 #             print(angle, self._result, '\n')
             rank = [0,0,0,0,0]
             for r, i in enumerate(self._result[0], start=1):
@@ -100,7 +104,7 @@ class OCRHuKouBen():
                     rank[4] = r
             rank = [i for i in rank if i>0]
             if rank==sorted(rank) and len(rank)>1:
-                self._image = image
+                self._image = image()
                 self._angle = angle
                 self._mode = 'shouye'
                 self._info = {i:'图片模糊' for i in self._keys_shouye if i in self._name_list}
@@ -130,7 +134,7 @@ class OCRHuKouBen():
                     rank[9] = r
             rank = [i for i in rank if i>0]
             if rank==sorted(rank) and len(rank)>1:
-                self._image = image
+                self._image = image()
                 self._angle = angle
                 self._mode = 'neirong'
                 self._info = {i:'图片模糊' for i in self._keys_neirong if i in self._name_list}
@@ -175,7 +179,7 @@ class OCRHuKouBen():
                         self._info['household_id'] = ''
                         jitihu = True
                         continue
-                    for char in self._char_household_name:
+                    for char in self._matcher.match(i[1][0])['household_name']:
                         if char in i[1][0]:
                             if len(i[1][0][i[1][0].find(char)+len(char):]):
                                 w = w*4/(len(i[1][0])+0.5)
@@ -572,16 +576,17 @@ class OCRHuKouBen():
         if len(result)==0:
             return 0
         axis_true = {i:tuple(axis[i]) for i in axis}
+        geometry, overlap = line_geometry(result[0], axis_true)
         if self._mode=='shouye':
             address = ''
-            for i in result[0]:
-                h = max(1, (i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2)
-                w = max(1, (i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2)
-                x = min(i[0][0][0], i[0][3][0])
-                y = min(i[0][0][1], i[0][1][1])
+            for k, i in enumerate(result[0]):
+                h = max(1, geometry['h'][k])
+                w = max(1, geometry['w'][k])
+                x = geometry['x'][k]
+                y = geometry['y'][k]
                 if '图片模糊' in self._info.get('household_type', '') and 'household_type' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['household_type'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['household_type'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['household_type'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['household_type'][0])            
+                    h1 = overlap['household_type'][0][k]
+                    w1 = overlap['household_type'][1][k]
                     for char in ['别']:
                         types = i[1][0][i[1][0].find(char)+len(char):] if char in i[1][0] else i[1][0]
                     if h1/h>0.6 and w1/w>0.6 and len(types)>1:
@@ -602,11 +607,11 @@ class OCRHuKouBen():
                         self._axis['household_type'] = [self._axis['household_type'][0], y]+i[0][2]
                         continue
                 if '图片模糊' in self._info.get('household_name', '') and 'household_name' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['household_name'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['household_name'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['household_name'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['household_name'][0])            
+                    h1 = overlap['household_name'][0][k]
+                    w1 = overlap['household_name'][1][k]
                     temp = la.text.sequence_preprocess(i[1][0])
-                    if sum([1 for char in self._char_household_name if char in temp])>0:
-                        for char in self._char_household_name:
+                    if len(self._matcher.match(temp)['household_name'])>0:
+                        for char in self._matcher.match(temp)['household_name']:
                             if char in temp and len(temp[temp.find(char)+len(char):])>1:
                                 temp = temp[temp.find(char)+len(char):].strip()
                                 break
@@ -618,8 +623,8 @@ class OCRHuKouBen():
                             self._axis['household_name'] = [self._axis['household_name'][0], y]+i[0][2]
                             continue
                 if '图片模糊' in self._info.get('household_id', '') and 'household_id' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['household_id'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['household_id'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['household_id'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['household_id'][0])            
+                    h1 = overlap['household_id'][0][k]
+                    w1 = overlap['household_id'][1][k]
                     for char in ['号']:
                         temp = i[1][0][i[1][0].find(char)+len(char):] if char in i[1][0] else i[1][0]
                     if temp.endswith('住'):
@@ -629,8 +634,8 @@ class OCRHuKouBen():
                         self._axis['household_id'] = [self._axis['household_id'][0], y]+i[0][2]
                         continue
                 if '图片模糊' in self._info.get('household_address', '') and 'household_address' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['household_address'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['household_address'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['household_address'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['household_address'][0])            
+                    h1 = overlap['household_address'][0][k]
+                    w1 = overlap['household_address'][1][k]
                     if h1/h>0.6 and w1/w>0.6:
                         if len(i[1][0][i[1][0].find('址')+len('址'):])>1 and '址' in i[1][0]:
                             address += i[1][0][i[1][0].find('址')+1:]
@@ -648,14 +653,14 @@ class OCRHuKouBen():
             register_city = ''
             register_address = ''
             register_name = ''
-            for i in result[0]:
-                h = (i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2
-                w = (i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2
-                x = min(i[0][0][0], i[0][3][0])
-                y = min(i[0][0][1], i[0][1][1])
+            for k, i in enumerate(result[0]):
+                h = geometry['h'][k]
+                w = geometry['w'][k]
+                x = geometry['x'][k]
+                y = geometry['y'][k]
                 if '图片模糊' in self._info['register_name'] and 'register_name' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_name'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_name'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_name'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_name'][0])            
+                    h1 = overlap['register_name'][0][k]
+                    w1 = overlap['register_name'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and '户口' not in i[1][0]:
                         if len(i[1][0])==1:
                             register_name += i[1][0]
@@ -668,29 +673,29 @@ class OCRHuKouBen():
                             self._axis['register_name'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_relation'] and 'register_relation' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_relation'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_relation'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_relation'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_relation'][0])            
+                    h1 = overlap['register_relation'][0][k]
+                    w1 = overlap['register_relation'][1][k]
                     if h1/h>0.6 and w1/w>0.6:
                         self._info['register_relation'] = i[1][0].replace('要', '妻').replace('麦', '妻')
                         self._axis['register_relation'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_previous_name'] and 'register_previous_name' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_previous_name'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_previous_name'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_previous_name'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_previous_name'][0])            
+                    h1 = overlap['register_previous_name'][0][k]
+                    w1 = overlap['register_previous_name'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and len(i[1][0])>1:
                         self._info['register_previous_name'] = i[1][0]
                         self._axis['register_previous_name'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_sex'] and 'register_sex' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_sex'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_sex'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_sex'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_sex'][0])            
+                    h1 = overlap['register_sex'][0][k]
+                    w1 = overlap['register_sex'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and i[1][0] in '男女':
                         self._info['register_sex'] = i[1][0]
                         self._axis['register_sex'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_birthplace'] and 'register_birthplace' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_birthplace'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_birthplace'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_birthplace'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_birthplace'][0])            
+                    h1 = overlap['register_birthplace'][0][k]
+                    w1 = overlap['register_birthplace'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and sum([1 for char in i[1][0] if char not in '出生地'])>2:
                         temp = i[1][0]
                         for char in '出生地':
@@ -700,8 +705,8 @@ class OCRHuKouBen():
                         self._axis['register_birthplace'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_nation'] and 'register_nation' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_nation'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_nation'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_nation'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_nation'][0])            
+                    h1 = overlap['register_nation'][0][k]
+                    w1 = overlap['register_nation'][1][k]
                     if h1/h>0.6 and w1/w>0.5:
                         temp = i[1][0]
                         if temp.startswith('族') and len(temp)>1:
@@ -710,8 +715,8 @@ class OCRHuKouBen():
                         self._axis['register_nation'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_nativeplace'] and 'register_nativeplace' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_nativeplace'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_nativeplace'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_nativeplace'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_nativeplace'][0])            
+                    h1 = overlap['register_nativeplace'][0][k]
+                    w1 = overlap['register_nativeplace'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and sum([1 for char in i[1][0] if char not in '籍贯'])>2:
                         temp = i[1][0]
                         for char in '籍贯':
@@ -721,8 +726,8 @@ class OCRHuKouBen():
                         self._axis['register_nativeplace'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_born'] and 'register_born' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_born'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_born'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_born'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_born'][0])            
+                    h1 = overlap['register_born'][0][k]
+                    w1 = overlap['register_born'][1][k]
                     if '出生日期' in i[1][0] and len(i[1][0][i[1][0].find('出生日期'):])>7:
                         self._info['register_born'] = i[1][0][i[1][0].find('出生日期')+4:]
                         self._axis['register_born'][3] = i[0][2][1]
@@ -738,15 +743,15 @@ class OCRHuKouBen():
                         self._axis['register_born'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_belief'] and 'register_belief' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_belief'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_belief'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_belief'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_belief'][0])            
+                    h1 = overlap['register_belief'][0][k]
+                    w1 = overlap['register_belief'][1][k]
                     if h1/h>0.6 and w1/w>0.6:
                         self._info['register_belief'] = i[1][0]
                         self._axis['register_belief'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_number'] and 'register_number' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_number'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_number'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_number'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_number'][0])            
+                    h1 = overlap['register_number'][0][k]
+                    w1 = overlap['register_number'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and sum([1 for char in i[1][0] if char in '0123456789xX'])>10:
                         if len(i[1][0])==17:
                             self._info['register_number'] = '1'+i[1][0]
@@ -755,15 +760,15 @@ class OCRHuKouBen():
                         self._axis['register_number'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_height'] and 'register_height' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_height'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_height'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_height'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_height'][0])            
+                    h1 = overlap['register_height'][0][k]
+                    w1 = overlap['register_height'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and sum([1 for char in i[1][0] if char in '0123456789cmCM厘米'])>2:
                         self._info['register_height'] = i[1][0]
                         self._axis['register_height'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_blood'] and 'register_blood' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_blood'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_blood'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_blood'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_blood'][0])            
+                    h1 = overlap['register_blood'][0][k]
+                    w1 = overlap['register_blood'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and sum([1 for char in i[1][0] if char not in '血型'])>0:
                         temp = i[1][0].replace('0', 'o')
                         if '血型' in i[1][0]:
@@ -772,15 +777,15 @@ class OCRHuKouBen():
                         self._axis['register_blood'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_education'] and 'register_education' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_education'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_education'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_education'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_education'][0])            
+                    h1 = overlap['register_education'][0][k]
+                    w1 = overlap['register_education'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and len(i[1][0])>1:
                         self._info['register_education'] = i[1][0].replace('天', '大')
                         self._axis['register_education'] = [x, y]+i[0][2]
                         continue 
                 if '图片模糊' in self._info['register_marriage'] and 'register_marriage' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_marriage'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_marriage'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_marriage'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_marriage'][0])            
+                    h1 = overlap['register_marriage'][0][k]
+                    w1 = overlap['register_marriage'][1][k]
                     if '婚姻状况' in i[1][0] and len(i[1][0][i[1][0].find('婚姻状况'):])>5:
                         self._info['register_marriage'] = i[1][0][i[1][0].find('婚姻状况')+4:]
                         self._axis['register_marriage'][3] = i[0][2][1]
@@ -790,22 +795,22 @@ class OCRHuKouBen():
                         self._axis['register_marriage'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_military'] and 'register_military' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_military'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_military'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_military'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_military'][0])            
+                    h1 = overlap['register_military'][0][k]
+                    w1 = overlap['register_military'][1][k]
                     if h1/h>0.6 and w1/w>0.6:
                         self._info['register_military'] = i[1][0]
                         self._axis['register_military'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_service_office'] and 'register_service_office' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_service_office'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_service_office'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_service_office'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_service_office'][0])            
+                    h1 = overlap['register_service_office'][0][k]
+                    w1 = overlap['register_service_office'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and sum([1 for char in i[1][0] if char not in '服务处所'])>1:
                         self._info['register_service_office'] = i[1][0]
                         self._axis['register_service_office'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_career'] and 'register_career' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_career'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_career'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_career'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_career'][0])            
+                    h1 = overlap['register_career'][0][k]
+                    w1 = overlap['register_career'][1][k]
     #                 print(i[1][0],h1/h, h1,h, w1/w, w1,w)
                     if h1/h>0.5 and w1/w>0.6 and len(i[1][0])>1:
                         temp = i[1][0]
@@ -817,15 +822,15 @@ class OCRHuKouBen():
                         self._axis['register_career'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_city'] and 'register_city' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_city'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_city'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_city'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_city'][0])            
+                    h1 = overlap['register_city'][0][k]
+                    w1 = overlap['register_city'][1][k]
                     if h1/h>0.6 and w1/w>0.6:
                         register_city += i[1][0].replace(' ', '')
                         self._axis['register_city'] = [x, y]+i[0][2]
                         continue
                 if '图片模糊' in self._info['register_address'] and 'register_address' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['register_address'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['register_address'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['register_address'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['register_address'][0])            
+                    h1 = overlap['register_address'][0][k]
+                    w1 = overlap['register_address'][1][k]
                     if h1/h>0.6 and w1/w>0.6:
                         register_address += i[1][0][i[1][0].find('本址')+2:].replace(' ', '') if '本址' in i[1][0] else i[1][0].replace(' ', '')
                         self._axis['register_address'] = [x, y]+i[0][2]
@@ -856,10 +861,12 @@ class OCRHuKouBen():
         for i in self._axis:
             self._axis[i] = [int(max(0, j)) for j in self._axis[i]]
     
-    def draw_mask(self):
-        image = self._image.copy()
+    def draw_mask(self, image=None, axis=None, bgr=False):
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = rotate_image(read_image(image, bgr=bgr)[0], axis['angle']).copy()
         try:
-            t = [la.image.box_convert(self._axis[i], 'xyxy', 'axis') for i in self._axis if i in self._keys]
+            t = [la.image.box_convert(axis['axis'][i], 'xyxy', 'axis') for i in axis['axis'] if i in self._keys]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
         except:
@@ -1,15 +1,15 @@
 from collections import defaultdict
 
-import cv2
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, stateless, OCRMixin, image_array, rotate_image, read_image
+
 __all__ = ['OCRHuKouBen']
 
 
-class OCRHuKouBen():
+class OCRHuKouBen(OCRMixin):
     def __init__(self, ocr=None):
-        self.ocr = paddleocr.PaddleOCR(show_log=False) if ocr is None else ocr
+        self.ocr = get_engine() if ocr is None else ocr
         self._keys = []
         self._char_household_type = ['农业家庭户', '非农业家庭户', '非农业家庭户口', '非农业集体', '非农业集体户口',
                                      '城市户口', '家庭户', '家庭户口']
@@ -21,10 +21,11 @@ class OCRHuKouBen():
         self._aug_image = True
         
     def draw_mask(self, image=None, axis=None, box_axis='all', mask_axis=None):
-        if image is None:
-            image = self._image.copy()
-        angle = self._angle if axis is None else axis['angle']
-        axis = self._axis if axis is None else axis['axis']
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = read_image(image)[0].copy()
+        angle = axis['angle']
+        axis = axis['axis']
 
         if box_axis=='all':
             box_axis = self._keys
@@ -58,7 +59,7 @@ class OCRHuKouBen():
 
         try:
             if angle>0:
-                image = la.image.rotate(image, angle, expand=True)
+                image = rotate_image(image, angle)
             t = [la.image.box_convert(axis[i], 'xyxy', 'axis') for i in box_axis if i not in mask_axis and i in axis]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
@@ -120,7 +121,8 @@ class OCRHuKouBen():
             score['error'] = error_list
         return score
     
-    def predict(self, image, axis=False, ocr_result=None):
+    @stateless
+    def predict(self, image, axis=False, ocr_result=None, bgr=False):
         self._axis = None
         self._show_axis = axis
         self._error = 'ok'
@@ -137,13 +139,14 @@ class OCRHuKouBen():
         else:
             if isinstance(image, str):
                 self._image_str = image
+                import cv2
                 self._image = cv2.imread(image)
                 self._image = cv2.cvtColor(self._image, cv2.COLOR_BGR2RGB)
                 self._image = la.image.array_to_image(self._image)
     #             image = la.image.read_image(image)
     #             self._image = la.image.color_convert(image)
             else:
-                self._image = image
+                self._image = read_image(image, bgr=bgr)[0]
             self._fit_direction(self._image)
             if isinstance(self._info, str):
                 self._fit_direction(la.image.enhance_brightness(self._image, 0.8))
@@ -194,18 +197,11 @@ class OCRHuKouBen():
             if self._image_str is not None and self._angle==0:
                 self._result = self.ocr.ocr(image, cls=False)
             else:
-                image1 = la.image.rotate(image, self._angle, expand=True)
-                image1 = la.image.image_to_array(image1)
+                image1 = image_array(image, self._angle)
                 self._result = self.ocr.ocr(image1, cls=False)
         else:
             self._result = []
-            for angle in [0, 90, 180, 270]:
-                if angle>0:
-                    image1 = la.image.rotate(image, angle, expand=True)
-                    image1 = la.image.image_to_array(image1)
-                else:
-                    image1 = la.image.image_to_array(image)
-                result = self.ocr.ocr(image1, cls=False)
+            for angle, _, result in ocr_direction(self.ocr, image, [0, 90, 180, 270]):
                 
                 rank = [0,0,0,0,0]
                 for r, i in enumerate(result[0], start=1):
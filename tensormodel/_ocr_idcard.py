@@ -1,15 +1,18 @@
 from collections import defaultdict
 
-import cv2
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, stateless, OCRMixin, image_array, rotate_image, read_image
+from tensormodel._ocr_normalize import make_table, normalize
+
 __all__ = ['OCRIDCard']
 
+_validity_table = make_table(delete='.一:-,')
+
 
-class OCRIDCard():
+class OCRIDCard(OCRMixin):
     def __init__(self, ocr=None):
-        self.ocr = paddleocr.PaddleOCR(show_log=False) if ocr is None else ocr
+        self.ocr = get_engine() if ocr is None else ocr
         self._char_name = [i+j for i in ['姓', '娃', '妇', '性', '赵', '生'] for j in ['名', '容', '吉']]
         self._char_sex = ['性别']
         self._char_nation = ['民族', '民旅', '民康', '民旗', '民路', '昆旗']
@@ -19,7 +22,8 @@ class OCRIDCard():
         self._keys = ['user_name', 'user_sex', 'user_nation', 'user_born', 'user_address', 
                       'user_number', 'user_face', 'user_card']
         
-    def predict(self, image, back=True, axis=False):
+    @stateless
+    def predict(self, image, back=True, axis=False, bgr=False):
         self._axis = defaultdict(list)
         self._show_axis = axis
         self._error = 'ok'
@@ -27,13 +31,14 @@ class OCRIDCard():
         self._angle_down = -1
         
         if isinstance(image, str):
+            import cv2
             self._image = cv2.imread(image)
             self._image = cv2.cvtColor(self._image, cv2.COLOR_BGR2RGB)
             self._image = la.image.array_to_image(self._image)
 #             image = la.image.read_image(image)
 #             self._image = la.image.color_convert(image)
         else:
-            self._image = image
+            self._image = read_image(image, bgr=bgr)[0]
         self._direction_transform(self._image, back)
         if isinstance(self._info, str):
             self._direction_transform(la.image.enhance_brightness(self._image, 0.8), back)
@@ -92,33 +97,22 @@ class OCRIDCard():
         self._result_down = []
         
         if self._angle_up!=-1 and self._angle_down==-1:
-            image1 = la.image.rotate(image, self._angle_up, expand=True)
-            image1 = la.image.image_to_array(image1)
+            image1 = image_array(image, self._angle_up)
             self._result_up = self.ocr.ocr(image1, cls=False)
         elif self._angle_up==-1 and self._angle_down!=-1:
-            image1 = la.image.rotate(image, self._angle_down, expand=True)
-            image1 = la.image.image_to_array(image1)
+            image1 = image_array(image, self._angle_down)
             self._result_down = self.ocr.ocr(image1, cls=False)
         elif self._angle_up!=-1 and self._angle_down!=-1 and self._angle_up==self._angle_down:
-            image1 = la.image.rotate(image, self._angle_down, expand=True)
-            image1 = la.image.image_to_array(image1)
+            image1 = image_array(image, self._angle_down)
             self._result_up = self.ocr.ocr(image1, cls=False)
             self._result_down = self._result_up.copy()
         elif self._angle_up!=-1 and self._angle_down!=-1 and self._angle_up!=self._angle_down:
-            image1 = la.image.rotate(image, self._angle_up, expand=True)
-            image1 = la.image.image_to_array(image1)
+            image1 = image_array(image, self._angle_up)
             self._result_up = self.ocr.ocr(image1, cls=False)
-            image1 = la.image.rotate(image, self._angle_down, expand=True)
-            image1 = la.image.image_to_array(image1)
+            image1 = image_array(image, self._angle_down)
             self._result_down = self.ocr.ocr(image1, cls=False)
         else:
-            for angle in [0, 90, 180, 270]:
-                if angle>0:
-                    image1 = la.image.rotate(image, angle, expand=True)
-                    image1 = la.image.image_to_array(image1)
-                else:
-                    image1 = la.image.image_to_array(image)
-                result = self.ocr.ocr(image1, cls=False)
+            for angle, _, result in ocr_direction(self.ocr, image, [0, 90, 180, 270]):
 
                 if not state_up:
                     rank = [0,0,0,0,0]
@@ -497,17 +491,13 @@ class OCRIDCard():
                         if sum([1 for j in i[1][0][-13:] if j in '0123456789.-长期'])==13:
                             self._info['user_validity_period'] = i[1][0][-13:]
                         else:
-                            temp = i[1][0]
-                            for j in ['.', '一', ':', '-', ',']:
-                                temp = temp.replace(j, '')
+                            temp = normalize(i[1][0], _validity_table)
                             while temp[0] not in self._char_number:
                                 temp = temp[1:]
                             if len(temp)==10:
                                 self._info['user_validity_period'] = f'{temp[:4]}.{temp[4:6]}.{temp[6:8]}-长期'
                     else:
-                        temp = i[1][0]
-                        for j in ['.', '一', ':', '-', ',']:
-                            temp = temp.replace(j, '')
+                        temp = normalize(i[1][0], _validity_table)
                         while temp[0] not in self._char_number:
                             temp = temp[1:]
                         if len(temp)==16:
@@ -530,10 +520,11 @@ class OCRIDCard():
 #                         break
     
     def draw_mask(self, image=None, axis=None, box_axis='all', mask_axis=None):
-        if image is None:
-            image = self._image.copy()
-        angle = self._angle_up if axis is None else axis['angle']
-        axis = self._axis if axis is None else axis['axis']
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = read_image(image)[0].copy()
+        angle = axis['angle']
+        axis = axis['axis']
 
         if box_axis=='all':
             box_axis = self._keys
@@ -568,7 +559,7 @@ class OCRIDCard():
 
         try:
             if angle>0:
-                image = la.image.rotate(image, angle, expand=True)
+                image = rotate_image(image, angle)
             t = [la.image.box_convert(axis[i], 'xyxy', 'axis') for i in box_axis if i not in mask_axis and i in axis]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
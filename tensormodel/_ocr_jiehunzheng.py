@@ -1,19 +1,26 @@
 import time
 
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, ocr_fields, text_height, stateless, OCRMixin, read_image, fit_side, scale_axis, image_array, crop_variants, rotate_image, line_geometry
+from tensormodel._ocr_match import KeywordMatcher
+from tensormodel._ocr_check import find_idcard
+from tensormodel._ocr_normalize import normalize, date_table
+
 __all__ = ['OCRJieHunZheng']
 
 
-class OCRJieHunZheng():
-    def __init__(self, model=True, name_list=None):
+class OCRJieHunZheng(OCRMixin):
+    def __init__(self, model=True, name_list=None, aug_workers=None, decode_side=None, side_range=(960, 2000)):
         if model==True:
-            self._model = paddleocr.PaddleOCR(show_log=False)
+            self._model = get_engine()
         elif model:
             self._model = model
         else:
             self._model = None
+        self._decode_side = decode_side
+        self._side_range = side_range
+        self._aug_workers = aug_workers
         self._keys = ['marriage_name', 'marriage_date', 'marriage_id', 'marriage_type',
                       'user_name_up', 'user_sex_up', 'user_country_up', 'user_born_up', 'user_number_up', 
                       'user_name_down', 'user_sex_down', 'user_country_down', 'user_born_down', 'user_number_down']
@@ -32,18 +39,19 @@ class OCRJieHunZheng():
         self._char_user_sex = ['性别']
         self._char_user_born = ['出生日期']
         self._char_user_number = ['身份证件号', '身份证件导']
+        self._matcher = KeywordMatcher({i:getattr(self, '_char_'+i) for i in ['marriage_name', 'marriage_date', 'marriage_id', 'user_name', 'user_country', 'user_number']})
         
-    def predict(self, image, axis=False, model=None):
+    @stateless
+    def predict(self, image, axis=False, model=None, bgr=False):
         self._axis_up_down = 0
         self._marriage_name_prob = 0
         self._show_axis = axis
         self._info = '图片模糊或非二代结离婚证图片'
         self._error = '图片模糊或非二代结离婚证图片'
         
-        if isinstance(image, str):
-            self._image = la.image.color_convert(la.image.read_image(image))
-        else:
-            self._image = image
+        self._source, self._source_scale = read_image(image, self._decode_side, bgr)
+        self._image, self._scale = fit_side(self._source, self._side_range)
+        self._scale *= self._source_scale
         self._fit_direction(self._model if model is None else model)
         if isinstance(self._info, str):
             if self._show_axis:
@@ -53,21 +61,20 @@ class OCRJieHunZheng():
         self._fit_axis()
         self._fit_characters(self._axis, self._result)
         
+        error_list = [i for i in self._info if '图片模糊' in self._info[i] and i in self._axis]
+        crops = []
+        array = image_array(self._image)
+        for i in error_list:
+            crops += [((i, aug), j) for aug, j in enumerate(crop_variants(array, self._axis[i], 0.8))]
+        result_crop = ocr_fields(self._model if model is None else model, crops, text_height(self._result), None, self._aug_workers)
         for aug in [0,1,2]:
             error_list = [i for i in self._info if '图片模糊' in self._info[i]]
             if error_list:
                 self._result_crop = []
                 for i in error_list:
-                    if i not in self._axis:
+                    if (i, aug) not in result_crop:
                         continue
-                    image = la.image.crop(self._image, self._axis[i])
-                    if aug==0:
-                        image = la.image.image_to_array(image)
-                    elif aug==1:
-                        image = la.image.image_to_array(la.image.color_convert(image, la.image.ColorMode.grayscale))[:,:,0]
-                    elif aug==2:
-                        image = la.image.image_to_array(la.image.enhance_brightness(image, 0.8))
-                    t = (self._model if model is None else model).ocr(image, cls=False)
+                    t = result_crop[(i, aug)]
                     if t[0]:
                         for j in t[0]:
                             self._result_crop.append([[self._axis[i][:2], [self._axis[i][2], self._axis[i][1]], 
@@ -77,14 +84,12 @@ class OCRJieHunZheng():
         self._error = '图片模糊' if [1 for i in self._info if '图片模糊' in self._info[i]] else 'ok'
         self._info = {i:('' if '图片模糊' in j else j) for i,j in self._info.items()}
         if self._show_axis:
-            return {'data':self._info, 'axis':self._axis, 'angle':self._angle, 'error':self._error}
+            return {'data':self._info, 'axis':scale_axis(self._axis, self._scale), 'angle':self._angle, 'error':self._error}
         else:
             return {'data':self._info, 'angle':self._angle, 'error':self._error}
         
     def _fit_direction(self, model):
-        for angle in [0, 90, 270, 180]:
-            image = la.image.rotate(self._image, angle, expand=True)
-            self._result = model.ocr(la.image.image_to_array(image), cls=False)
+        for angle, image, self._result in ocr_direction(model, self._image):
             logic = 0
             logic_r = 0
             number_n = 0
@@ -119,7 +124,7 @@ class OCRJieHunZheng():
                 continue
             rank = [i for i in rank if i>0]
             if rank==sorted(rank) and len(rank)>1:
-                self._image = image
+                self._image = image()
                 self._angle = angle
                 self._info = {i:'图片模糊' for i in self._name_list}
                 break
@@ -146,7 +151,7 @@ class OCRJieHunZheng():
             x = min(i[0][0][0], i[0][3][0])
             y = min(i[0][0][1], i[0][1][1])
             if 'marriage_name' not in axis_true:
-                temp = [char for char in self._char_marriage_name if char in i[1][0]]
+                temp = self._matcher.match(i[1][0])['marriage_name']
                 if temp:
                     if len(i[1][0][i[1][0].find(temp[0])+len(temp[0]):])>1:
                         w = w*3/len(i[1][0])
@@ -155,7 +160,7 @@ class OCRJieHunZheng():
                     axis_dict['marriage_id'].append(([x, y+h*6, x+w*4.5, y+h*9.5], 0.6))
                     continue
             if 'marriage_date' not in axis_true:
-                temp = [char for char in self._char_marriage_date if char in i[1][0]]
+                temp = self._matcher.match(i[1][0])['marriage_date']
                 if temp:
                     if len(i[1][0][i[1][0].find(temp[0])+len(temp[0]):])>1:
                         w = w*0.3
@@ -164,7 +169,7 @@ class OCRJieHunZheng():
                     axis_dict['marriage_id'].append(([x, y+h*3, x+w*4.5, y+h*6.5], 0.8))
                     continue
             if 'marriage_id' not in axis_true:
-                temp = [char for char in self._char_marriage_id if char in i[1][0]]
+                temp = self._matcher.match(i[1][0])['marriage_id']
                 if temp:
                     if len(i[1][0][i[1][0].find(temp[0])+len(temp[0]):])>1:
                         w = w*0.3
@@ -173,7 +178,7 @@ class OCRJieHunZheng():
                     axis_dict['marriage_date'].append(([x, y-h*3.5, x+w*2.5, y-h*0.5], 0.8))
                     continue
             if 'user_name_up' not in axis_true and i[0][0][1]<self._axis_up_down:
-                temp = [char for char in self._char_user_name if char in i[1][0]]
+                temp = self._matcher.match(i[1][0])['user_name']
                 if temp:
                     if len(i[1][0])>2:
                         w = w*2/(len(i[1][0])+1)
@@ -188,7 +193,7 @@ class OCRJieHunZheng():
                     axis_dict['user_number_down'].append(([x+w, None, x+w*9, None], 100))
                     continue
             if 'user_country_up' not in axis_true and i[0][0][1]<self._axis_up_down:
-                temp = [char for char in self._char_user_country if char in i[1][0]]
+                temp = self._matcher.match(i[1][0])['user_country']
                 if temp:
                     if len(i[1][0][i[1][0].find(temp[0])+len(temp[0]):])>1:
                         w = w*2/(len(i[1][0])+1)
@@ -217,7 +222,7 @@ class OCRJieHunZheng():
                     axis_dict['user_born_up'].append(([axis_true['user_number_up'][0]+w*1.5, axis_true['user_number_up'][1]-h*1.75, 
                                                        axis_true['user_number_up'][0]+w*2.3, axis_true['user_number_up'][1]-h*0.1], 0.6))
                     continue
-                temp = [char for char in self._char_user_number if char in i[1][0]]
+                temp = self._matcher.match(i[1][0])['user_number']
                 if temp:
                     if len(i[1][0][i[1][0].find(temp[0])+len(temp[0]):])>1:
                         w = w*0.3
@@ -232,7 +237,7 @@ class OCRJieHunZheng():
                     axis_dict['user_number_down'].append(([x+w*0.5, None, x+w*4, None], 100))
                     continue
             if 'user_name_down' not in axis_true and i[0][0][1]>self._axis_up_down:
-                temp = [char for char in self._char_user_name if char in i[1][0]]
+                temp = self._matcher.match(i[1][0])['user_name']
                 if temp:
                     if len(i[1][0])>2:
                         w = w*2/(len(i[1][0])+1)
@@ -247,7 +252,7 @@ class OCRJieHunZheng():
                     axis_dict['user_number_down'].append(([x+w, None, x+w*9, None], 100))
                     continue
             if 'user_country_down' not in axis_true and i[0][0][1]>self._axis_up_down:
-                temp = [char for char in self._char_user_country if char in i[1][0]]
+                temp = self._matcher.match(i[1][0])['user_country']
                 if temp:
                     if len(i[1][0][i[1][0].find(temp[0])+len(temp[0]):])>1:
                         w = w*2/(len(i[1][0])+1)
@@ -276,7 +281,7 @@ class OCRJieHunZheng():
                     axis_dict['user_born_down'].append(([axis_true['user_number_down'][0]+w*1.5, axis_true['user_number_down'][1]-h*1.75, 
                                                          axis_true['user_number_down'][0]+w*2.3, axis_true['user_number_down'][1]-h*0.1], 0.6))
                     continue
-                temp = [char for char in self._char_user_number if char in i[1][0]]
+                temp = self._matcher.match(i[1][0])['user_number']
                 if temp:
                     if len(i[1][0][i[1][0].find(temp[0])+len(temp[0]):])>1:
                         w = w*0.3
@@ -310,25 +315,26 @@ class OCRJieHunZheng():
             return 0
 
         axis_true = {i:tuple(axis[i]) for i in axis}
+        geometry, overlap = line_geometry(result[0], axis_true)
         fix_x = []
         marriage_id = ''
-        for i in result[0]:
+        for k, i in enumerate(result[0]):
             if sum([1 for char in i[1][0] if char in '仅用于使'])>2:
                 continue
             for j in ['国籍', '出生日期', '身份证件号']:
                 if j in i[1][0]:
                     step_name = False
-            h = (i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2
-            w = (i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2
+            h = geometry['h'][k]
+            w = geometry['w'][k]
             if h==0:
                 h = 1
             if w==0:
                 w = 1
-            x = min(i[0][0][0], i[0][3][0])
-            y = min(i[0][0][1], i[0][1][1])
+            x = geometry['x'][k]
+            y = geometry['y'][k]
             if '图片模糊' in self._info.get('marriage_name', '') and 'marriage_name' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['marriage_name'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['marriage_name'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['marriage_name'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['marriage_name'][0])            
+                h1 = overlap['marriage_name'][0][k]
+                w1 = overlap['marriage_name'][1][k]
                 if h1/h>0.6 and w1/w>0.6 and sum([1 for char in i[1][0] if char in '年月日登记期0123456789'])<3:
                     if '人' in i[1][0] and len(i[1][0][i[1][0].find('人')+1:])>1:
                         self._info['marriage_name'] = i[1][0][i[1][0].find('人')+1:]
@@ -346,8 +352,8 @@ class OCRJieHunZheng():
                 if '图片模糊' not in self._info['marriage_name']:
                     continue
             if '图片模糊' in self._info.get('marriage_date', '') and 'marriage_date' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['marriage_date'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['marriage_date'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['marriage_date'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['marriage_date'][0])
+                h1 = overlap['marriage_date'][0][k]
+                w1 = overlap['marriage_date'][1][k]
                 temp = self._analysis_date(i[1][0])
                 if h1/h>0.6 and w1/w>0.6 and len(temp)==11 and temp.find('年')==4:
                     self._info['marriage_date'] = temp
@@ -359,8 +365,8 @@ class OCRJieHunZheng():
                 elif i[1][0].startswith('离婚证'):
                     self._info['marriage_type'] = '离婚证'
             if '图片模糊' in self._info.get('marriage_id', '') and 'marriage_id' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['marriage_id'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['marriage_id'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['marriage_id'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['marriage_id'][0])            
+                h1 = overlap['marriage_id'][0][k]
+                w1 = overlap['marriage_id'][1][k]
                 temp = i[1][0]
                 for n,m in [('T', 'J'), ('--', '-'), (' ', ''), ('结宇', '结字'), ('.', ''), ('（', '('), ('）', ')'),
                             ('Q', '0'), ('f', '1'), ('I', '1')]:
@@ -388,8 +394,8 @@ class OCRJieHunZheng():
             if '图片模糊' in self._info.get('user_name_up', '') and 'user_name_up' in axis_true and i[0][0][1]<self._axis_up_down:
                 temp = la.text.sequence_preprocess(i[1][0])
                 if sum([1 for char in temp if char in '国籍中性别男女出生期身份证件号'])<2:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['user_name_up'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['user_name_up'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['user_name_up'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['user_name_up'][0])            
+                    h1 = overlap['user_name_up'][0][k]
+                    w1 = overlap['user_name_up'][1][k]
                     for char in self._char_user_name+['姓', '名']:
                         if temp.startswith(char):
                             temp = temp[temp.find(char)+len(char):]
@@ -405,8 +411,8 @@ class OCRJieHunZheng():
             if '图片模糊' in self._info.get('user_country_up', '') and 'user_country_up' in axis_true and i[0][0][1]<self._axis_up_down:
                 temp = find_country(i[1][0])
                 if temp:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['user_country_up'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['user_country_up'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['user_country_up'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['user_country_up'][0]) 
+                    h1 = overlap['user_country_up'][0][k]
+                    w1 = overlap['user_country_up'][1][k]
                     if h1/h>0.6 and w1/w>0.4:
                         self._info['user_country_up'] = temp
                         self._axis['user_country_up'] = [self._axis['user_country_up'][0], y]+i[0][2]
@@ -419,7 +425,7 @@ class OCRJieHunZheng():
                     self._info['user_born_up'] = temp[2]
                 else:
                     temp = i[1][0].replace(' ', '').replace('（', '(').replace('）', ')')
-                    for char in self._char_user_number:
+                    for char in self._matcher.match(temp)['user_number']:
                         if char in temp:
                             temp = temp[temp.find(char)+len(char):]
                     if len(temp)>8:
@@ -434,8 +440,8 @@ class OCRJieHunZheng():
             if '图片模糊' in self._info.get('user_name_down', '') and 'user_name_down' in axis_true:
                 temp = la.text.sequence_preprocess(i[1][0])
                 if sum([1 for char in temp if char in '国籍中性别男女出生期身份证件号'])<2:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['user_name_down'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['user_name_down'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['user_name_down'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['user_name_down'][0])            
+                    h1 = overlap['user_name_down'][0][k]
+                    w1 = overlap['user_name_down'][1][k]
                     for char in self._char_user_name+['姓', '名']:
                         if temp.startswith(char):
                             temp = temp[temp.find(char)+len(char):]
@@ -446,8 +452,8 @@ class OCRJieHunZheng():
             if '图片模糊' in self._info.get('user_country_down', '') and 'user_country_down' in axis_true and i[0][0][1]>self._axis_up_down:
                 temp = find_country(i[1][0])
                 if temp:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['user_country_down'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['user_country_down'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['user_country_down'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['user_country_down'][0]) 
+                    h1 = overlap['user_country_down'][0][k]
+                    w1 = overlap['user_country_down'][1][k]
                     if h1/h>0.6 and w1/w>0.4:
                         self._info['user_country_down'] = temp
                         self._axis['user_country_down'] = [self._axis['user_country_down'][0], y]+i[0][2]
@@ -460,7 +466,7 @@ class OCRJieHunZheng():
                     self._info['user_born_down'] = temp[2]
                 else:
                     temp = i[1][0].replace(' ', '').replace('（', '(').replace('）', ')')
-                    for char in self._char_user_number:
+                    for char in self._matcher.match(temp)['user_number']:
                         if char in temp:
                             temp = temp[temp.find(char)+len(char):]
                     if len(temp)>8:
@@ -558,8 +564,7 @@ class OCRJieHunZheng():
             self._axis[i] = [int(max(0, j)) for j in self._axis[i]]
     
     def _analysis_date(self, data):
-        temp = data.replace('日月', '11月').replace('.', '-').replace('/', '-')
-        temp = ''.join([char for char in temp if char in '0123456789年月日-'])
+        temp = normalize(data.replace('日月', '11月'), date_table)
         if temp.find('-')>0:
             temp = temp[:temp.find('-')]+'年'+temp[temp.find('-')+1:]
         if temp.find('-')>0:
@@ -584,10 +589,12 @@ class OCRJieHunZheng():
             temp = ''
         return temp
     
-    def draw_mask(self):
-        image = self._image.copy()
+    def draw_mask(self, image=None, axis=None, bgr=False):
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = rotate_image(read_image(image, bgr=bgr)[0], axis['angle']).copy()
         try:
-            t = [la.image.box_convert(self._axis[i], 'xyxy', 'axis') for i in self._axis if i in self._keys]
+            t = [la.image.box_convert(axis['axis'][i], 'xyxy', 'axis') for i in axis['axis'] if i in self._keys]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
         except:
@@ -662,21 +669,17 @@ def find_country(data):
     return ''
 
 def find_shenfenzheng(data):
-    temp = data.replace('x', 'X')
-    year = time.localtime(time.time()).tm_year
-    if sum([1 for i in temp if i in '0123456789X'])<15:
-        return []
-    for i in range(0,len(temp)-14):
-        t = ''.join([j for j in temp[i:i+18] if j in '0123456789X'])
-        if 'X' in t:
-            if not (t.count('X')==1 and t.endswith('X')):
-                continue
-        if len(t)==17:
-            t = ('3' if int(t[0])>5 else '1')+t
-        if len(t)==18:
-            if 1900<int(t[6:10])<year and int(t[10:12])<13 and int(t[12:14])<32:
-                return [t, '男' if int(t[16])%2 else '女', f"{t[6:10]}年{t[10:12]}月{t[12:14]}日"]
-        elif len(t)==15 and 'X' not in t:
-            if int(t[8:10])<13 and int(t[10:12])<32:
-                return [t, '男' if int(t[-1])%2 else '女', f"19{t[6:8]}年{t[8:10]}月{t[10:12]}日"]
+    temp = ''.join([i for i in data.replace('x', 'X') if i in '0123456789X'])
+    if len(temp)==17 and 'X' not in temp[:-1]:
+        temp = ('3' if int(temp[0])>5 else '1')+temp
+    if len(temp)>=18:
+        hit = find_idcard(temp)
+        if hit is None:
+            return []
+        t = temp[hit[0]:hit[0]+18]
+        return [t, '男' if int(t[16])%2 else '女', f"{t[6:10]}年{t[10:12]}月{t[12:14]}日"]
+    elif len(temp)==15 and 'X' not in temp:
+        t = temp
+        if int(t[8:10])<13 and int(t[10:12])<32:
+            return [t, '男' if int(t[-1])%2 else '女', f"19{t[6:8]}年{t[8:10]}月{t[10:12]}日"]
     return []
\ No newline at end of file
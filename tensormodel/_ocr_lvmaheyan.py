@@ -1,19 +1,22 @@
 import time
 
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, stateless, OCRMixin, read_image, fit_side, scale_axis, image_array, crop_array, rotate_image, line_geometry
+
 __all__ = ['OCRLvMaHeYan']
 
 
-class OCRLvMaHeYan():
-    def __init__(self, model=True, name_list=None):
+class OCRLvMaHeYan(OCRMixin):
+    def __init__(self, model=True, name_list=None, decode_side=None, side_range=(960, 2400)):
         if model==True:
-            self._model = paddleocr.PaddleOCR(show_log=False)
+            self._model = get_engine()
         elif model:
             self._model = model
         else:
             self._model = None
+        self._decode_side = decode_side
+        self._side_range = side_range
         self._keys = ['check_id', 'check_effective_time', 'check_purpose', 'check_status', 'check_serial_number']
         if name_list is None:
             name_list = self._keys.copy()
@@ -23,15 +26,15 @@ class OCRLvMaHeYan():
                     raise ValueError(f'Variable name `{i}`  does not conform to the specification.')
         self._name_list = name_list
         
-    def predict(self, image, axis=False, model=None):
+    @stateless
+    def predict(self, image, axis=False, model=None, bgr=False):
         self._show_axis = axis
         self._info = '图片模糊或非核验图片'
         self._error = '图片模糊或非核验图片'
         
-        if isinstance(image, str):
-            self._image = la.image.color_convert(la.image.read_image(image))
-        else:
-            self._image = image
+        self._source, self._source_scale = read_image(image, self._decode_side, bgr)
+        self._image, self._scale = fit_side(self._source, self._side_range)
+        self._scale *= self._source_scale
         self._fit_direction(self._model if model is None else model)
         if isinstance(self._info, str):
             if self._show_axis:
@@ -44,12 +47,13 @@ class OCRLvMaHeYan():
         error_list = [i for i in self._info if '图片模糊' in self._info[i]]
         if error_list:
             self._result_crop = []
+            array = image_array(self._image)
             tax_remark_logic = True
             for i in error_list:
                 if i not in self._axis:
                     continue
-                image = la.image.crop(self._image, self._axis[i])
-                t = (self._model if model is None else model).ocr(la.image.image_to_array(image), cls=False)
+                image = crop_array(array, self._axis[i])
+                t = (self._model if model is None else model).ocr(image, cls=False)
                 if t[0]:
                     for j in t[0]:
                         if i.startswith('tax_remark'):
@@ -61,18 +65,12 @@ class OCRLvMaHeYan():
         self._error = '图片模糊' if [1 for i in self._info if '图片模糊' in self._info[i]] else 'ok'
         self._info = {i:('' if '图片模糊' in j else j) for i,j in self._info.items()}
         if self._show_axis:
-            return {'data':self._info, 'axis':self._axis, 'angle':self._angle, 'error':self._error}
+            return {'data':self._info, 'axis':scale_axis(self._axis, self._scale), 'angle':self._angle, 'error':self._error}
         else:
             return {'data':self._info, 'angle':self._angle, 'error':self._error}
         
     def _fit_direction(self, model):
-        for angle, gray in zip([0, 0, 90, 90, 270, 270, 180, 180], [0, 1,0, 1,0, 1,0, 1]):
-            image = la.image.rotate(self._image, angle, expand=True)
-            if gray==1:
-                image1 = la.image.image_to_array(la.image.color_convert(image, la.image.ColorMode.grayscale))[:,:,0]
-            else:
-                image1 = la.image.image_to_array(image)
-            self._result = model.ocr(image1, cls=False)
+        for angle, image, self._result in ocr_direction(model, self._image, gray=True):
 #             print(angle, self._result, '\n')
             rank = [0,0,0,0,0]
             for r, i in enumerate(self._result[0], start=1):
@@ -93,7 +91,7 @@ class OCRLvMaHeYan():
                         rank[4] = r
             rank = [i for i in rank if i>0]
             if rank==sorted(rank) and len(rank)>1:
-                self._image = image
+                self._image = image()
                 self._angle = angle
                 self._info = {i:'图片模糊' for i in self._name_list}
                 break
@@ -143,18 +141,19 @@ class OCRLvMaHeYan():
             return 0
         
         axis_true = {i:tuple(axis[i]) for i in axis}
-        for i in result[0]:
-            h = (i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2
-            w = (i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2
+        geometry, overlap = line_geometry(result[0], axis_true)
+        for k, i in enumerate(result[0]):
+            h = geometry['h'][k]
+            w = geometry['w'][k]
             if h==0:
                 h = 1
             if w==0:
                 w = 1
-            x = min(i[0][0][0], i[0][3][0])
-            y = min(i[0][0][1], i[0][1][1])
+            x = geometry['x'][k]
+            y = geometry['y'][k]
             if '图片模糊' in self._info.get('check_id', '') and 'check_id' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['check_id'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['check_id'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['check_id'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['check_id'][0])            
+                h1 = overlap['check_id'][0][k]
+                w1 = overlap['check_id'][1][k]
                 if h1/h>0.6 and w1/w>0.6:
                     temp = i[1][0].replace(' ', '')
                     if len(temp)==sum([1 for char in temp if char in '0123456789']):
@@ -162,8 +161,8 @@ class OCRLvMaHeYan():
                         self._axis['check_id'] = [x, y]+i[0][2]
                         continue
             if '图片模糊' in self._info.get('check_effective_time', '') and 'check_effective_time' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['check_effective_time'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['check_effective_time'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['check_effective_time'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['check_effective_time'][0])            
+                h1 = overlap['check_effective_time'][0][k]
+                w1 = overlap['check_effective_time'][1][k]
                 if h1/h>0.6 and w1/w>0.6:
                     temp = i[1][0].replace(' ', '').replace('——', '至').replace('—', '至')
                     if len(temp)==sum([1 for char in temp if char in '0123456789至-']):
@@ -178,15 +177,15 @@ class OCRLvMaHeYan():
                             self._axis['check_effective_time'] = [x, y]+i[0][2]
                             continue
             if '图片模糊' in self._info.get('check_purpose', '') and 'check_purpose' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['check_purpose'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['check_purpose'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['check_purpose'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['check_purpose'][0])            
+                h1 = overlap['check_purpose'][0][k]
+                w1 = overlap['check_purpose'][1][k]
                 if h1/h>0.6 and w1/w>0.6:
                     self._info['check_purpose'] = '购房' if '型' in i[1][0] else i[1][0]
                     self._axis['check_purpose'] = [x, y]+i[0][2]
                     continue
             if '图片模糊' in self._info.get('check_serial_number', '') and 'check_serial_number' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['check_serial_number'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['check_serial_number'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['check_serial_number'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['check_serial_number'][0])            
+                h1 = overlap['check_serial_number'][0][k]
+                w1 = overlap['check_serial_number'][1][k]
                 if h1/h>0.6 and w1/w>0.6:
                     self._info['check_serial_number'] = i[1][0]
                     self._axis['check_serial_number'] = [x, y]+i[0][2]
@@ -202,10 +201,12 @@ class OCRLvMaHeYan():
         for i in self._axis:
             self._axis[i] = [int(max(0, j)) for j in self._axis[i]]
     
-    def draw_mask(self):
-        image = self._image.copy()
+    def draw_mask(self, image=None, axis=None, bgr=False):
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = rotate_image(read_image(image, bgr=bgr)[0], axis['angle']).copy()
         try:
-            t = [la.image.box_convert(self._axis[i], 'xyxy', 'axis') for i in self._axis if i in self._keys]
+            t = [la.image.box_convert(axis['axis'][i], 'xyxy', 'axis') for i in axis['axis'] if i in self._keys]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
         except:
@@ -1,15 +1,15 @@
 from collections import defaultdict
 
-import cv2
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, stateless, OCRMixin, image_array, rotate_image, read_image
+
 __all__ = ['OCRMarriageCard']
 
 
-class OCRMarriageCard():
+class OCRMarriageCard(OCRMixin):
     def __init__(self, ocr=None):
-        self.ocr = paddleocr.PaddleOCR(show_log=False) if ocr is None else ocr
+        self.ocr = get_engine() if ocr is None else ocr
         self._keys = ['marriage_name', 'marriage_date', 'marriage_id', 
                       'user_name_up', 'user_sex_up', 'user_country_up', 'user_born_up', 'user_number_up', 
                       'user_name_down', 'user_sex_down', 'user_country_down', 'user_born_down', 'user_number_down', 
@@ -21,7 +21,8 @@ class OCRMarriageCard():
         self._char_user_country = ['国籍', '国箱', '国馨', '国精']
         self._char_number = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
         
-    def predict(self, image, axis=False, ocr_result=None):
+    @stateless
+    def predict(self, image, axis=False, ocr_result=None, bgr=False):
         self._marriage_name_prob = 0
         self._axis = None
         self._show_axis = axis
@@ -34,13 +35,14 @@ class OCRMarriageCard():
             self._axis_transform()
         else:
             if isinstance(image, str):
+                import cv2
                 self._image = cv2.imread(image)
                 self._image = cv2.cvtColor(self._image, cv2.COLOR_BGR2RGB)
                 self._image = la.image.array_to_image(self._image)
     #             image = la.image.read_image(image)
     #             self._image = la.image.color_convert(image)
             else:
-                self._image = image
+                self._image = read_image(image, bgr=bgr)[0]
             self._direction_transform(self._image)
             if isinstance(self._info, str):
                 self._direction_transform(la.image.enhance_brightness(self._image, 0.8))
@@ -86,18 +88,11 @@ class OCRMarriageCard():
         if use_ocr_result:
             self._angle = 0
         elif self._angle!=-1:
-            image1 = la.image.rotate(image, self._angle, expand=True)
-            image1 = la.image.image_to_array(image1)
+            image1 = image_array(image, self._angle)
             self._result = self.ocr.ocr(image1, cls=False)
         else:
             self._result = []
-            for angle in [0, 90, 180, 270]:
-                if angle>0:
-                    image1 = la.image.rotate(image, angle, expand=True)
-                    image1 = la.image.image_to_array(image1)
-                else:
-                    image1 = la.image.image_to_array(image)
-                result = self.ocr.ocr(image1, cls=False)
+            for angle, _, result in ocr_direction(self.ocr, image, [0, 90, 180, 270]):
                 rank = [0,0,0,0,0]
                 for r, i in enumerate(result[0], start=1):
                     if '持证人' in i[1][0]:
@@ -570,10 +565,11 @@ class OCRMarriageCard():
     
     
     def draw_mask(self, image=None, axis=None, box_axis='all', mask_axis=None):
-        if image is None:
-            image = self._image.copy()
-        angle = self._angle if axis is None else axis['angle']
-        axis = self._axis if axis is None else axis['axis']
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = read_image(image)[0].copy()
+        angle = axis['angle']
+        axis = axis['axis']
 
         if box_axis=='all':
             box_axis = self._keys
@@ -608,7 +604,7 @@ class OCRMarriageCard():
 
         try:
             if angle>0:
-                image = la.image.rotate(image, angle, expand=True)
+                image = rotate_image(image, angle)
             t = [la.image.box_convert(axis[i], 'xyxy', 'axis') for i in box_axis if i not in mask_axis and i in axis]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
@@ -0,0 +1,154 @@
+from collections import Counter, deque
+
+__all__ = ['KeywordMatcher', 'FuzzyIndex', 'PrefixTrie']
+
+
+class KeywordMatcher():
+    """Aho-Corasick automaton over named keyword lists.
+
+    One pass over a text finds every keyword of every list, e.g.
+    `KeywordMatcher({'sex':['性别', '性利'], 'nation':['民族']}).match('性别男 民族汉')`
+    gives `{'sex':['性别'], 'nation':['民族']}`.
+    """
+    def __init__(self, groups, cache_size=4096):
+        self._groups = {i:list(j) for i, j in groups.items()}
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for name, words in self._groups.items():
+            for index, word in enumerate(words):
+                if not word:
+                    continue
+                node = 0
+                for char in word:
+                    if char not in self._goto[node]:
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._out.append([])
+                        self._goto[node][char] = len(self._goto)-1
+                    node = self._goto[node][char]
+                self._out[node].append((name, index))
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0) if node else 0
+                self._out[child] = self._out[child]+self._out[self._fail[child]]
+        self._cache = {}
+        self._cache_size = cache_size
+
+    def __getitem__(self, name):
+        return self._groups[name]
+
+    def find(self, text):
+        """Every `(name, keyword, start)` occurrence in `text`, ordered by end offset."""
+        result = []
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for name, index in self._out[node]:
+                word = self._groups[name][index]
+                result.append((name, word, end+1-len(word)))
+        return result
+
+    def match(self, text):
+        """`{name: keywords of that list found in text, in list order}` for every list.
+
+        Same as `[char for char in words if char in text]` per list; the result is cached
+        per text and must not be modified.
+        """
+        result = self._cache.get(text)
+        if result is not None:
+            return result
+        found = {i:set() for i in self._groups}
+        node = 0
+        for char in text:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for name, index in self._out[node]:
+                found[name].add(index)
+        result = {i:[self._groups[i][j] for j in sorted(found[i])] for i in found}
+        if len(self._cache)>=self._cache_size:
+            self._cache.clear()
+        self._cache[text] = result
+        return result
+
+
+class FuzzyIndex():
+    """Character inverted index that finds the best `fuzz.partial_ratio` word for a text.
+
+    `best(text)` gives the same `(word, score)` as
+    `sorted([(i, fuzz.partial_ratio(i, text)) for i in words], key=lambda x:x[1])[-1]`,
+    but only scores words whose shared characters with `text` can still reach the best score.
+    """
+    def __init__(self, words, scorer=None):
+        self._words = list(words)
+        self._index = {}
+        for index, word in enumerate(self._words):
+            for char, count in Counter(word).items():
+                self._index.setdefault(char, []).append((index, count))
+        if scorer is None:
+            from fuzzywuzzy import fuzz
+            scorer = fuzz.partial_ratio
+        self._scorer = scorer
+
+    def bound(self, text):
+        """`{index: upper bound of the partial ratio}` for every word sharing a character with `text`."""
+        shared = {}
+        for char, count in Counter(text).items():
+            for index, n in self._index.get(char, []):
+                shared[index] = shared.get(index, 0)+min(n, count)
+        result = {}
+        for index, n in shared.items():
+            m = min(len(self._words[index]), len(text))
+            n = min(n, m)
+            result[index] = int(round(200*n/(m+n)))
+        return result
+
+    def best(self, text, threshold=0):
+        """Best `(word, score)` with score at least `threshold`, last word in list order on ties, or None."""
+        if not self._words:
+            return None
+        best = (threshold, -1)
+        for limit, index in sorted([(j, i) for i, j in self.bound(text).items()], reverse=True):
+            if limit<best[0]:
+                break
+            score = self._scorer(self._words[index], text)
+            if (score, index)>=best:
+                best = (score, index)
+        if best[1]==-1 or best[0]<=0:
+            return (self._words[-1], 0) if threshold<=0 else None
+        return (self._words[best[1]], best[0])
+
+
+class PrefixTrie():
+    """Trie over string prefixes, looked up in O(prefix length).
+
+    `PrefixTrie({'622588':'招商银行'}).longest('6225880123456789')` gives `('622588', '招商银行')`.
+    """
+    def __init__(self, table):
+        self._root = {}
+        for prefix, value in table.items():
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[None] = value
+
+    def longest(self, text):
+        """`(prefix, value)` for the longest prefix of `text` in the table, or None."""
+        node = self._root
+        result = None
+        for n, char in enumerate(text):
+            if char not in node:
+                break
+            node = node[char]
+            if None in node:
+                result = (text[:n+1], node[None])
+        return result
@@ -0,0 +1,44 @@
+import re
+
+__all__ = ['make_table', 'normalize', 'date_tail', 'date_table', 'datetime_table']
+
+
+class _KeepTable(dict):
+    """`str.translate` table that also deletes every character outside `keep`.
+
+    Characters are resolved on first sight and memoized, so each distinct character costs one
+    Python-level lookup for the life of the table.
+    """
+    def __init__(self, mapping, keep):
+        super().__init__(mapping)
+        self._keep = {ord(i) for i in keep}
+
+    def __missing__(self, key):
+        self[key] = key if key in self._keep else None
+        return self[key]
+
+
+def make_table(mapping=None, delete='', keep=None):
+    """Translation table for `normalize`.
+
+    `mapping` maps single characters (OCR confusions such as '一' to '-' or 'o' to '0'), `delete`
+    lists characters to drop and, with `keep`, every character outside `keep` (and not mapped)
+    is dropped as well.
+    """
+    table = str.maketrans(mapping if mapping else {})
+    table.update({ord(i):None for i in delete})
+    return table if keep is None else _KeepTable(table, keep)
+
+
+def normalize(data, table):
+    """`data.translate(table)`, or a list of that for every string of a list or tuple."""
+    if isinstance(data, str):
+        return data.translate(table)
+    return [i.translate(table) for i in data]
+
+
+_date_confusions = {'.':'-', '/':'-', '一':'-', '—':'-', '－':'-', 'o':'0', 'O':'0'}
+
+date_table = make_table(_date_confusions, keep='0123456789年月日-')
+datetime_table = make_table({'/':'-'})
+date_tail = re.compile('([0-9]{4})(-?)([0-9]{2})\\2([0-9]{2})$')
@@ -1,19 +1,25 @@
 import time
 
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, ocr_fields, text_height, stateless, OCRMixin, read_image, fit_side, scale_axis, image_array, crop_variants, rotate_image, line_geometry, field_overlaps
+from tensormodel._ocr_match import KeywordMatcher
+from tensormodel._ocr_normalize import normalize, datetime_table
+
 __all__ = ['OCRPOSPiao']
 
 
-class OCRPOSPiao():
-    def __init__(self, model=True, name_list=None):
+class OCRPOSPiao(OCRMixin):
+    def __init__(self, model=True, name_list=None, aug_workers=None, decode_side=None, side_range=(960, 2400)):
         if model==True:
-            self._model = paddleocr.PaddleOCR(show_log=False)
+            self._model = get_engine()
         elif model:
             self._model = model
         else:
             self._model = None
+        self._decode_side = decode_side
+        self._side_range = side_range
+        self._aug_workers = aug_workers
         self._keys = ['merchant_name', 'merchant_id', 'terminal_id', 'issuance_bank', 'acquiring_bank',
                       'voucher_id', 'authorization_id', 'batch_id', 'reference_id', 'trace_id', 'invoice_id',
                       'trade_type', 'trade_date', 'trade_id', 'trade_amount']
@@ -28,16 +34,17 @@ class OCRPOSPiao():
         self._char_merchant_id = ['商户编号', '商广编号']
         self._char_terminal_id = ['终端编号', '冬端编号']
         self._char_trade_date = ['交易日期', '日期时间', '日期/时间']
+        self._matcher = KeywordMatcher({i:getattr(self, '_char_'+i) for i in ['merchant_name', 'merchant_id', 'terminal_id', 'trade_date']})
     
-    def predict(self, image, axis=False, model=None):
+    @stateless
+    def predict(self, image, axis=False, model=None, bgr=False):
         self._show_axis = axis
         self._info = '图片模糊或非POS小票图片'
         self._error = '图片模糊或非POS小票图片'
         
-        if isinstance(image, str):
-            self._image = la.image.color_convert(la.image.read_image(image))
-        else:
-            self._image = image
+        self._source, self._source_scale = read_image(image, self._decode_side, bgr)
+        self._image, self._scale = fit_side(self._source, self._side_range)
+        self._scale *= self._source_scale
         self._fit_direction(self._model if model is None else model)
         if isinstance(self._info, str):
             if self._show_axis:
@@ -48,19 +55,18 @@ class OCRPOSPiao():
         self._fit_characters(self._axis, self._result)
         
         
+        crops = []
+        array = image_array(self._image)
+        for g in self._info:
+            if [i for i in self._info[g] if '图片模糊' in self._info[g][i]]:
+                crops += [((g, aug), j) for aug, j in enumerate(crop_variants(array, self._axis[g], 0.65))]
+        result_crop = ocr_fields(self._model if model is None else model, crops, text_height(self._result), None, self._aug_workers)
         for g in self._info:
             for aug in [0,1,2]:
                 error_list = [i for i in self._info[g] if '图片模糊' in self._info[g][i]]
-                if error_list:
+                if error_list and (g, aug) in result_crop:
                     self._result_crop = []
-                    image = la.image.crop(self._image, self._axis[g])
-                    if aug==0:
-                        image = la.image.image_to_array(image)
-                    elif aug==1:
-                        image = la.image.image_to_array(la.image.color_convert(image, la.image.ColorMode.grayscale))[:,:,0]
-                    elif aug==2:
-                        image = la.image.image_to_array(la.image.enhance_brightness(image, 0.65))
-                    t = (self._model if model is None else model).ocr(image, cls=False)
+                    t = result_crop[(g, aug)]
                     if t[0]:
                         for j in t[0]:
                             self._result_crop.append([[self._axis[g][:2], [self._axis[g][2], self._axis[g][1]], 
@@ -71,14 +77,12 @@ class OCRPOSPiao():
         self._error = '图片模糊' if [1 for g in self._info for i in self._info[g] if '图片模糊' in self._info[g][i]] else 'ok'
 #         self._info = {i:('' if '图片模糊' in j else j) for i,j in self._info.items()}
         if self._show_axis:
-            return {'data':info, 'axis':self._axis, 'angle':self._angle, 'error':self._error}
+            return {'data':info, 'axis':scale_axis(self._axis, self._scale), 'angle':self._angle, 'error':self._error}
         else:
             return {'data':info, 'angle':self._angle, 'error':self._error}
     
     def _fit_direction(self, model):
-        for angle in [0, 90, 270, 180]:
-            image = la.image.rotate(self._image, angle, expand=True)
-            self._result = model.ocr(la.image.image_to_array(image), cls=False)
+        for angle, image, self._result in ocr_direction(model, self._image):
 #             print(angle, result, '\n')
 #             t = [1 if len(i[1][0])>4 and (i[0][1][0]-i[0][0][0])<(i[0][3][1]-i[0][0][1]) else 0 for i in self._result[0]]
 #             print(sum(t)/len(t))
@@ -88,11 +92,11 @@ class OCRPOSPiao():
 #             print(angle, result, '\n')
             rank = [0,0,0,0,0]
             for r, i in enumerate(self._result[0], start=1):
-                if [char for char in self._char_merchant_name if char in i[1][0]] and sum(rank)==0:
+                if self._matcher.match(i[1][0])['merchant_name'] and sum(rank)==0:
                     rank[0] = r
-                elif [char for char in self._char_merchant_id if char in i[1][0]] and sum(rank[1:])==0:
+                elif self._matcher.match(i[1][0])['merchant_id'] and sum(rank[1:])==0:
                     rank[1] = r
-                elif [char for char in self._char_terminal_id if char in i[1][0]] and sum(rank[2:])==0:
+                elif self._matcher.match(i[1][0])['terminal_id'] and sum(rank[2:])==0:
                     rank[2] = r
                 elif '交易类型' in i[1][0] and sum(rank[3:])==0:
                     rank[3] = r
@@ -103,7 +107,7 @@ class OCRPOSPiao():
 #             print(angle, rank)
             rank = [i for i in rank if i>0]
             if rank==sorted(rank) and len(rank)>1:
-                self._image = image
+                self._image = image()
                 self._angle = angle
                 self._info = {'group0':{i:'图片模糊' for i in self._keys if i in self._name_list}}
                 break
@@ -130,7 +134,7 @@ class OCRPOSPiao():
             if logic:
                 continue
                 
-            if [char for char in self._char_merchant_name if char in i[1][0]]:
+            if self._matcher.match(i[1][0])['merchant_name']:
                 if len(i[1][0])>5 and len(la.text.sequence_preprocess(i[1][0]))<5:
                     w = w*4/((len(i[1][0])-4)/2.5+4)
                 elif len(i[1][0])>5 and len(la.text.sequence_preprocess(i[1][0]))>=5:
@@ -138,13 +142,13 @@ class OCRPOSPiao():
                 axis_true[f'group{group}'] = [x-w*0.25, y-h*0.5, x+w*4.5, y+h*24]
                 group += 1
                 continue
-            if [char for char in self._char_merchant_id if char in i[1][0]]:
+            if self._matcher.match(i[1][0])['merchant_id']:
                 if len(i[1][0])>5:
                     w = w*4/((len(i[1][0])-4)/2.5+4)
                 axis_true[f'group{group}'] = [x-w*0.25, y-h*1.5, x+w*4.5, y+h*23]
                 group += 1
                 continue
-            if [char for char in self._char_terminal_id if char in i[1][0]]:
+            if self._matcher.match(i[1][0])['terminal_id']:
                 if len(i[1][0])>5:
                     w = w*4/((len(i[1][0])-4)/2.5+4)
                 axis_true[f'group{group}'] = [x-w*0.25, y-h*2.5, x+w*4.5, y+h*22]
@@ -164,34 +168,34 @@ class OCRPOSPiao():
         if len(result)==0:
             return 0
         axis_true = {i:tuple(axis[i]) for i in axis}
+        geometry = line_geometry(result[0])[0]
+        near = field_overlaps(result[0], axis_true)
         
-        for i in result[0]:
-            h = max((i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2, 1)
-            w = max((i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2, 1)
-            x = min(i[0][0][0], i[0][3][0])
-            y = min(i[0][0][1], i[0][1][1])
+        for k, i in enumerate(result[0]):
+            h = max(geometry['h'][k], 1)
+            w = max(geometry['w'][k], 1)
+            x = geometry['x'][k]
+            y = geometry['y'][k]
             
-            for g in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true[g][3])-max(min(i[0][0][1], i[0][1][1]), axis_true[g][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true[g][2])-max(min(i[0][0][0], i[0][3][0]), axis_true[g][0])            
+            for g, h1, w1 in near[k]:
                 if h1/h>0.6 and w1/w>0.6:
                     temp = i[1][0].replace('：', ':').replace('）', ')').replace('（', '(')
                     if '图片模糊' in self._info[g].get('merchant_name', ''):
-                        char = [char for char in self._char_merchant_name if char in temp]
+                        char = self._matcher.match(temp)['merchant_name']
                         if char:
                             char = temp.split(char[0])[-1].split(':')[-1]
                             if len(char)>1:
                                 self._info[g]['merchant_name'] = char
                                 break
                     if '图片模糊' in self._info[g].get('merchant_id', ''):
-                        char = [char for char in self._char_merchant_id if char in temp]
+                        char = self._matcher.match(temp)['merchant_id']
                         if char:
                             char = temp.split(char[0])[-1].split(':')[-1]
                             if len(char)>3:
                                 self._info[g]['merchant_id'] = char
                                 break
                     if '图片模糊' in self._info[g].get('terminal_id', ''):
-                        char = [char for char in self._char_terminal_id if char in temp]
+                        char = self._matcher.match(temp)['terminal_id']
                         if char:
                             char = temp.split(char[0])[-1].split(':')[-1]
                             if len(char)>3:
@@ -275,12 +279,12 @@ class OCRPOSPiao():
                                 self._info[g]['trade_type'] = t
                                 break
                     if '图片模糊' in self._info[g].get('trade_date', ''):
-                        t = [char for char in self._char_trade_date if char in temp]
+                        t = self._matcher.match(temp)['trade_date']
                         if t:
                             t = temp.split(t[0])[-1]
                             t = t[t.find(':')+1:]
                             if len(t)>1:
-                                t = t.replace('/', '-')
+                                t = normalize(t, datetime_table)
                                 if t[10]!=' ':
                                     t = t[:10]+' '+t[10:]
                                 self._info[g]['trade_date'] = t
@@ -294,25 +298,28 @@ class OCRPOSPiao():
                             self._info[g]['trade_amount'] = '¥'+temp.upper().replace(' ', '').split('RMB')[-1].split(':')[-1]
                             break
         
+        near_lines = {g:[] for g in axis_true}
+        for r, line in enumerate(near):
+            for g, h1, w1 in line:
+                near_lines[g].append((r, h1, w1))
         for g in axis_true:
             if [1 for i in self._info[g] if '图片模糊' in self._info[g].get(i, '')]:
-                for r,i in enumerate(result[0]):
-                    h = max((i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2, 1)
-                    w = max((i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2, 1)
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true[g][3])-max(min(i[0][0][1], i[0][1][1]), axis_true[g][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true[g][2])-max(min(i[0][0][0], i[0][3][0]), axis_true[g][0])
+                for r, h1, w1 in near_lines[g]:
+                    i = result[0][r]
+                    h = max(geometry['h'][r], 1)
+                    w = max(geometry['w'][r], 1)
                     if h1/h>0.6 and w1/w>0.6 and '图片模糊' in self._info[g].get('merchant_name', ''):
-                        if [char for char in self._char_merchant_name if char in result[0][max(r-1,0)][1][0]]:
-                            if sum([1 for char in self._char_merchant_id if char in i[1][0]])==0:
+                        if self._matcher.match(result[0][max(r-1,0)][1][0])['merchant_name']:
+                            if len(self._matcher.match(i[1][0])['merchant_id'])==0:
                                 self._info[g]['merchant_name'] = i[1][0]
                                 continue
                     if h1/h>0.6 and w1/w>0.6 and '图片模糊' in self._info[g].get('merchant_id', ''):
-                        if [char for char in self._char_merchant_id if char in result[0][max(r-1,0)][1][0]]:
-                            if sum([1 for char in self._char_terminal_id if char in i[1][0]])==0:
+                        if self._matcher.match(result[0][max(r-1,0)][1][0])['merchant_id']:
+                            if len(self._matcher.match(i[1][0])['terminal_id'])==0:
                                 self._info[g]['merchant_id'] = i[1][0]
                                 continue
                     if h1/h>0.6 and w1/w>0.6 and '图片模糊' in self._info[g].get('terminal_id', ''):
-                        if [char for char in self._char_terminal_id if char in result[0][max(r-1,0)][1][0]]:
+                        if self._matcher.match(result[0][max(r-1,0)][1][0])['terminal_id']:
                             if sum([1 for char in i[1][0] if char in ':0123456789'])==len(i[1][0]):
                                 self._info[g]['terminal_id'] = i[1][0].replace(':','')
                                 continue
@@ -356,9 +363,9 @@ class OCRPOSPiao():
                                     self._info[g]['trade_type'] = char
                                     break
                     if h1/h>0.6 and w1/w>0.6 and '图片模糊' in self._info[g].get('trade_date', ''):
-                        if [char for char in self._char_trade_date if char in result[0][max(r-1,0)][1][0]]:
+                        if self._matcher.match(result[0][max(r-1,0)][1][0])['trade_date']:
                             if sum([1 for char in '金额AMOUNT' if char in i[1][0]])==0:
-                                char = i[1][0].replace('/', '-')
+                                char = normalize(i[1][0], datetime_table)
                                 if char[10]!=' ':
                                     char = char[:10]+' '+char[10:]
                                 self._info[g]['trade_date'] = char
@@ -384,10 +391,12 @@ class OCRPOSPiao():
         info = {i[0]:info[i[0]] for i in sorted(g, key=lambda x:x[1])}
         return info
                 
-    def draw_mask(self):
-        image = self._image.copy()
+    def draw_mask(self, image=None, axis=None, bgr=False):
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = rotate_image(read_image(image, bgr=bgr)[0], axis['angle']).copy()
         try:
-            t = [la.image.box_convert(self._axis[i], 'xyxy', 'axis') for i in self._axis]
+            t = [la.image.box_convert(axis['axis'][i], 'xyxy', 'axis') for i in axis['axis']]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
         except:
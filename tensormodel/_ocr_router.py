@@ -0,0 +1,70 @@
+from tensormodel._ocr_engine import get_engine, ocr_direction, CachedEngine, read_image, fit_side, scale_axis
+from tensormodel._ocr_match import KeywordMatcher
+from tensormodel._ocr_shenfenzheng import OCRShenFenZheng
+from tensormodel._ocr_hukouben import OCRHuKouBen
+from tensormodel._ocr_jiehunzheng import OCRJieHunZheng
+from tensormodel._ocr_yinhangka import OCRYinHangKa
+from tensormodel._ocr_pospiao import OCRPOSPiao
+from tensormodel._ocr_wanshuipiao import OCRWanShuiPiao
+from tensormodel._ocr_lvmaheyan import OCRLvMaHeYan
+
+__all__ = ['OCRRouter']
+
+
+class OCRRouter():
+    def __init__(self, model=True, doc_types=None):
+        if model==True:
+            self._model = get_engine()
+        elif model:
+            self._model = model
+        else:
+            self._model = None
+        self._parsers = {
+            'shenfenzheng':OCRShenFenZheng, 'hukouben':OCRHuKouBen, 'jiehunzheng':OCRJieHunZheng,
+            'yinhangka':OCRYinHangKa, 'pospiao':OCRPOSPiao, 'wanshuipiao':OCRWanShuiPiao, 'lvmaheyan':OCRLvMaHeYan}
+        if doc_types is None:
+            doc_types = list(self._parsers)
+        else:
+            for i in doc_types:
+                if i not in self._parsers:
+                    raise ValueError(f'`doc_types` must be in {list(self._parsers)}, but got `{i}`.')
+        self._parsers = {i:self._parsers[i](model=self._model) for i in doc_types}
+        side = [i._side_range for i in self._parsers.values()]
+        self._side_range = (min(max([i[0] for i in side]), min([i[1] for i in side])), min([i[1] for i in side]))
+        self._char_anchor = {
+            'shenfenzheng':['姓名', '性别', '民族', '出生', '住址', '公民身份号码', '中华人民共和国', '居民身份证', '签发机关', '有效期限'],
+            'hukouben':['常住人口登记卡', '登记事项变更', '户别', '户主姓名', '户号', '户口专用', '承办人', '曾用名', '籍贯',
+                        '宗教信仰', '文化程度', '婚姻状况', '服务处所'],
+            'jiehunzheng':['持证人', '登记日期', '结婚证字号', '离婚证字号', '备注', '国籍', '身份证件号'],
+            'yinhangka':['银联', '借记卡', '信用卡', '储蓄卡', '持卡人', '一卡通', '闪付', 'UnionPay', 'Bank', 'VALID', 'THRU'],
+            'pospiao':['商户名', '商户编号', '终端编号', '交易类型', '凭证号', '授权码', '批次号', '参考号', '交易日期'],
+            'wanshuipiao':['税收完税证明', '填发日期', '税务机关', '纳税人识别号', '纳税人名称', '品目名称', '税款所属时期',
+                           '金额合计', '填票人', '妥善保管'],
+            'lvmaheyan':['核验编号', '核验用途', '申请时间', '有效时间', '家庭描述', '家庭申报', '房产数量']}
+        self._matcher = KeywordMatcher(self._char_anchor)
+
+    def predict(self, image, axis=False, model=None, bgr=False):
+        """Route `image` to the parser whose anchor keywords it matches best.
+
+        The image is resized once to the side range all routed parsers share, so each parser's
+        own `fit_side` leaves it as is and its OCR passes are served from the routing cache.
+        Angles are read in probed order until one of them hits an anchor.
+        """
+        image, scale = fit_side(read_image(image, bgr=bgr)[0], self._side_range)
+        model = CachedEngine(self._model if model is None else model)
+        score = {}
+        for angle, _, result in ocr_direction(model, image):
+            hits = self._matcher.match(''.join([i[1][0] for i in (result[0] if result[0] else [])]))
+            score = {i:len(hits[i]) for i in self._parsers if len(hits[i])>0}
+            if score:
+                break
+        for i in sorted(score, key=lambda x:score[x], reverse=True):
+            result = self._parsers[i].predict(image, axis=axis, model=model)
+            if not isinstance(result['data'], str):
+                if axis:
+                    result['axis'] = scale_axis(result['axis'], scale)
+                result['type'] = i
+                return result
+        if axis:
+            return {'data':'图片模糊或非支持的证件图片', 'axis':[], 'angle':0, 'error':'图片模糊或非支持的证件图片', 'type':''}
+        return {'data':'图片模糊或非支持的证件图片', 'angle':0, 'error':'图片模糊或非支持的证件图片', 'type':''}
@@ -1,19 +1,26 @@
 import time
 
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, ocr_fields, text_height, stateless, OCRMixin, read_image, fit_side, scale_axis, image_array, crop_variants, rotate_image, line_geometry
+from tensormodel._ocr_match import KeywordMatcher
+from tensormodel._ocr_check import idcard_valid, find_idcard
+
 __all__ = ['OCRShenFenZheng']
 
 
-class OCRShenFenZheng():
-    def __init__(self, model=True, name_list=None):
+class OCRShenFenZheng(OCRMixin):
+    def __init__(self, model=True, name_list=None, aug_workers=None, decode_side=None, side_range=(640, 1600)):
         if model==True:
-            self._model = paddleocr.PaddleOCR(show_log=False)
+            self._model = get_engine()
         elif model:
             self._model = model
         else:
             self._model = None
+        self._decode_side = decode_side
+        self._side_range = side_range
+        self._aug_workers = aug_workers
+        self._aug_validate = {'user_number':user_number_valid}
         self._keys_front = ['user_name', 'user_sex', 'user_nation', 'user_born', 'user_address', 'user_number']
         self._keys_back = ['user_type', 'user_organization', 'user_validity_period']
         self._keys = self._keys_front+self._keys_back
@@ -39,19 +46,21 @@ class OCRShenFenZheng():
             '北京市', '天津市', '上海市', '重庆市', '河北省', '河南省', '湖北省', '湖南省', '江苏省', '江西省', '辽宁省', 
             '吉林省', '黑龙江省', '陕西省', '山西省', '山东省', '四川省', '青海省', '安徽省', '海南省', '广东省', '贵州省', 
             '浙江省', '福建省', '甘肃省', '云南省', '西藏', '宁夏', '广西', '新疆', '内蒙古']
+        self._matcher = KeywordMatcher({i:getattr(self, '_char_'+i) for i in ['name', 'sex', 'nation', 'nation_1', 'address', 'organization', 'nation_list']})
         
-    def predict(self, image, axis=False, model=None, back=True):
+    @stateless
+    def predict(self, image, axis=False, model=None, back=True, bgr=False):
         self._show_axis = axis
         self._back = back
         self._mode = ''
         self._axis = dict()
         self._info = '图片模糊或非二代身份证图片'
         self._error = '图片模糊或非二代身份证图片'
+        self._number_read = False
         
-        if isinstance(image, str):
-            self._image = la.image.color_convert(la.image.read_image(image))
-        else:
-            self._image = image
+        self._source, self._source_scale = read_image(image, self._decode_side, bgr)
+        self._image, self._scale = fit_side(self._source, self._side_range)
+        self._scale *= self._source_scale
         self._fit_direction(self._model if model is None else model)
         if isinstance(self._info, str):
             if self._show_axis:
@@ -61,6 +70,28 @@ class OCRShenFenZheng():
         self._fit_axis()
         self._fit_characters(self._axis, self._result)
         
+        error_list = [i for i in self._keys_front if '图片模糊' in self._info.get(i,'') and i in self._axis]
+        crops = []
+        array = image_array(self._image)
+        number = self._info.get('user_number', '图片模糊')
+        if len(number)==18 and not (self._number_read and idcard_valid(number)) and 'user_number' in self._axis:
+            error_list.append('user_number')
+        for i in error_list:
+            crops += [((i, aug), j) for aug, j in enumerate(crop_variants(array, self._axis[i], 0.8))]
+        result_crop = ocr_fields(self._model if model is None else model, crops, text_height(self._result), self._aug_validate, self._aug_workers)
+        if 'user_number' in error_list and '图片模糊' not in number:
+            for aug in [0,1,2]:
+                t = result_crop.get(('user_number', aug), [[]])
+                temp = find_shenfenzheng(''.join([j[1][0] for j in (t[0] if t[0] else [])]), full_date=False)
+                if temp and temp[3] and idcard_valid(temp[0]):
+                    for i, j in zip(['user_number', 'user_sex', 'user_born'], temp):
+                        if i in self._info:
+                            self._info[i] = j
+                    x, y = [max(int(round(i)), 0) for i in self._axis['user_number'][:2]]
+                    box = [j for i in t[0] for j in i[0]]
+                    self._axis['user_number'] = [x+min([i[0] for i in box]), y+min([i[1] for i in box]), 
+                                                 x+max([i[0] for i in box]), y+max([i[1] for i in box])]
+                    break
         for aug in [0,1,2]:
             error_list = [i for i in self._keys_front if '图片模糊' in self._info.get(i,'')]
 #             if 'user_address' not in error_list and 'user_address' in self._info:
@@ -68,19 +99,9 @@ class OCRShenFenZheng():
             if error_list:
                 self._result_crop = []
                 for i in error_list:
-                    if i not in self._axis:
-                        continue
-                    image = la.image.crop(self._image, self._axis[i])
-                    if aug==0:
-                        image = la.image.image_to_array(image)
-                    elif aug==1:
-                        image = la.image.image_to_array(la.image.rgb_to_grayscale(image))[:,:,0]
-                    elif aug==2:
-                        image = la.image.image_to_array(la.image.enhance_brightness(image, 0.8))
-                    try:
-                        t = (self._model if model is None else model).ocr(image, cls=False)
-                    except:
+                    if (i, aug) not in result_crop:
                         continue
+                    t = result_crop[(i, aug)]
                     if t[0]:
                         for j in t[0]:
                             self._result_crop.append([[self._axis[i][:2], [self._axis[i][2], self._axis[i][1]], 
@@ -94,14 +115,12 @@ class OCRShenFenZheng():
         self._error = '图片模糊' if [1 for i in self._info if '图片模糊' in self._info[i]] else 'ok'
         self._info = {i:('' if '图片模糊' in j else j) for i,j in self._info.items()}
         if self._show_axis:
-            return {'data':self._info, 'axis':self._axis, 'angle':self._angle, 'error':self._error}
+            return {'data':self._info, 'axis':scale_axis(self._axis, self._scale), 'angle':self._angle, 'error':self._error}
         else:
             return {'data':self._info, 'angle':self._angle, 'error':self._error}
         
     def _fit_direction(self, model):
-        for angle in [0, 90, 270, 180]:
-            image = la.image.rotate(self._image, angle, expand=True)
-            result = model.ocr(la.image.image_to_array(image), cls=False)
+        for angle, image, result in ocr_direction(model, self._image):
             
             result = [[i for i in result[0] if (i[0][1][0]-i[0][0][0])>(i[0][3][1]-i[0][0][1])*1.2 or len(i[1][0])==1]]
 #             result = [[i for i in result[0] if (i[0][1][0]-i[0][0][0])>(i[0][3][1]-i[0][0][1])*1.5 and len(la.text.sequence_preprocess(i[1][0]))>=min(3, len(i[1][0]))]]
@@ -120,16 +139,16 @@ class OCRShenFenZheng():
                 for r, i in enumerate(result[0], start=1):
                     if [char for char in ['性出生'] if char in i[1][0]]:
                         continue
-                    elif sum([1 for char in self._char_name if char in i[1][0]]):
+                    elif len(self._matcher.match(i[1][0])['name']):
                         if rank[0]==0:
                             rank[0] = r
-                    elif sum([1 for char in self._char_sex if char in i[1][0]]):
+                    elif len(self._matcher.match(i[1][0])['sex']):
                         if rank[1]==0:
                             rank[1] = r
-                    elif sum([1 for char in self._char_nation if char in i[1][0]]):
+                    elif len(self._matcher.match(i[1][0])['nation']):
                         if rank[1]==0:
                             rank[1] = r
-                    elif sum([1 for char in self._char_nation_1 if char in i[1][0]]):
+                    elif len(self._matcher.match(i[1][0])['nation_1']):
                         if rank[1]==0:
                             rank[1] = r
 #                     elif '出生' in i[1][0] and len(i[1][0]) in [11, 12, 13] and i[1][0].find('年')==6 and '月' in i[1][0] and i[1][0].endswith('日'):
@@ -140,7 +159,7 @@ class OCRShenFenZheng():
                     elif len(i[1][0]) in [9, 10, 11] and i[1][0].find('年')==4 and '月' in i[1][0] and i[1][0].endswith('日'):
                         if rank[2]==0:
                             rank[2] = r
-                    elif sum([1 for char in self._char_address if char in i[1][0]]):
+                    elif len(self._matcher.match(i[1][0])['address']):
                         if rank[3]==0:
                             rank[3] = r
                     elif sum([1 for char in '省市县区镇乡街路' if char in i[1][0]])>1:
@@ -158,7 +177,7 @@ class OCRShenFenZheng():
 #                     if sum(temp)/len(temp)>=0.5:
 #                 if sum([1 for n,m in zip(rank, sorted(rank)) if n==m])>1:
                 if rank==sorted(rank) and len(rank)>1:
-                    self._image = image
+                    self._image = image()
                     self._angle = angle
                     self._mode += 'front'
                     self._result = result.copy()
@@ -185,7 +204,7 @@ class OCRShenFenZheng():
 #                     if rank[1]>rank[0]:
                     rank = [i for i in rank if i>0]
                     if rank==sorted(rank) and len(rank)>1:
-                        self._image = image
+                        self._image = image()
                         self._angle = angle
                         self._mode += 'back'
                         self._result = result.copy()
@@ -218,7 +237,7 @@ class OCRShenFenZheng():
             h = (i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2
             w = (i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2
             if 'user_name' not in axis_true:
-                for char in self._char_name:
+                for char in self._matcher.match(i[1][0])['name']:
                     if char in i[1][0]:
                         if len(i[1][0][i[1][0].find(char)+len(char):])>1:
                             self._info['user_name'] = (i[1][0][i[1][0].find(char)+len(char):]).strip()
@@ -241,7 +260,7 @@ class OCRShenFenZheng():
                 if 'user_name' in axis_true:
                     continue
             if 'user_sex' not in axis_true:
-                for char in self._char_sex:
+                for char in self._matcher.match(i[1][0])['sex']:
                     if char in i[1][0] and len(i[1][0][i[1][0].find(char)+len(char):])<2:
                         if len(i[1][0][i[1][0].find(char)+len(char):])==1:
                             w = w/(len(i[1][0])+2.5)
@@ -262,7 +281,7 @@ class OCRShenFenZheng():
                 if 'user_sex' in axis_true:
                     continue
             if 'user_nation' not in axis_true:
-                for char in self._char_nation:
+                for char in self._matcher.match(i[1][0])['nation']:
                     if char in i[1][0] and '男' not in i[1][0] and '女' not in i[1][0]:
                         w = w/(len(i[1][0])+1)
                         if len(i[1][0][i[1][0].find(char)+len(char):])>0:
@@ -308,7 +327,7 @@ class OCRShenFenZheng():
                 axis_dict['user_address'].append(([x+w*3.5, y+h*1.5, x+w*21.5, y+h*5.5], 0.8))
                 continue
             if 'user_address' not in axis_true:
-                for char in self._char_address:
+                for char in self._matcher.match(i[1][0])['address']:
                     if char in i[1][0]:
                         if len(i[1][0][i[1][0].find(char)+len(char):])>0:
                             w = w/(len(i[1][0])+2.5)
@@ -353,23 +372,24 @@ class OCRShenFenZheng():
         
     def _fit_characters(self, axis, result):
         axis_true = {i:tuple(axis[i]) for i in axis}
+        geometry, overlap = line_geometry(result[0], axis_true)
         if 'front' in self._mode:
             fix_x = []
             address = ''
             rank = 0
-            for i in result[0]:
+            for k, i in enumerate(result[0]):
                 if sum([1 for char in '仅限供使专用做' if char in i[1][0]])>1:
                     continue
-                h = max((i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2, 1)
-                w = max((i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2, 1)
-                x = min(i[0][0][0], i[0][3][0])
-                y = min(i[0][0][1], i[0][1][1])
+                h = max(geometry['h'][k], 1)
+                w = max(geometry['w'][k], 1)
+                x = geometry['x'][k]
+                y = geometry['y'][k]
                 if '图片模糊' in self._info.get('user_name', ''):
                     temp = i[1][0].replace('#', '')
                     if sum([1 for char in temp if char in '性别男女民族汉生址'])<3:
                         if 'user_name' in axis_true:
-                            h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['user_name'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['user_name'][1])
-                            w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['user_name'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['user_name'][0])            
+                            h1 = overlap['user_name'][0][k]
+                            w1 = overlap['user_name'][1][k]
                             if h1/h>0.6 and w1/w>0.6 or (h1/h>0.25 and w1/w>0.25 and rank==0):
                                 if len(temp)>3 and temp.find('名')==1:
                                     self._info['user_name'] = temp[2:]
@@ -398,27 +418,28 @@ class OCRShenFenZheng():
                                 self._axis['user_name'] = [self._axis['user_name'][0], i[0][0][1]]+i[0][2]
                             continue
                 if '图片模糊' in self._info.get('user_sex', ''):
-                    temp = [char for char in self._char_sex+self._char_nation+self._char_nation_1 if char in i[1][0]]
+                    hits = self._matcher.match(i[1][0])
+                    temp = hits['sex']+hits['nation']+hits['nation_1']
                     if temp:
                         if '女' in i[1][0] or '男' in i[1][0]:
                             self._info['user_sex'] = '女' if '女' in i[1][0] else '男'
                 if '图片模糊' in self._info.get('user_nation', ''):
                     temp = i[1][0].replace('画', '回').replace('间', '回').replace('阁', '回').replace('翰', '斡')
-                    temp = [(temp[temp.find(char)+len(char):]).strip() for char in self._char_nation if char in temp]
+                    temp = [(temp[temp.find(char)+len(char):]).strip() for char in self._matcher.match(temp)['nation']]
                     temp = [char for char in temp if char!='']
                     if temp:
-                        nation_list = [char for char in self._char_nation_list if char in temp[0]]
+                        nation_list = self._matcher.match(temp[0])['nation_list']
                         if nation_list:
                             self._info['user_nation'] = nation_list[0]
                             self._axis['user_nation'] = [i[0][0][0]+(i[0][1][0]-i[0][0][0])/(len(i[1][0])+2)*(len(i[1][0])+2-len(self._info['user_nation'])), 
                                                          i[0][0][1]]+i[0][2]
                             continue
                 if '图片模糊' in self._info.get('user_nation', '') and 'user_nation' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['user_nation'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['user_nation'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['user_nation'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['user_nation'][0])
+                    h1 = overlap['user_nation'][0][k]
+                    w1 = overlap['user_nation'][1][k]
                     if h1/h>0.6 and w1/w>0.45:
                         temp = i[1][0].replace('画', '回').replace('间', '回').replace('阁', '回').replace('翰', '斡')
-                        nation_list = [char for char in self._char_nation_list if char in temp]
+                        nation_list = self._matcher.match(temp)['nation_list']
                         if nation_list:
                             self._info['user_nation'] = nation_list[0]
                             continue
@@ -434,25 +455,26 @@ class OCRShenFenZheng():
                     if temp:
                         self._info['user_number'] = temp[0]
                         self._info['user_born'] = temp[2]
+                        self._number_read = temp[3]
                         if '图片模糊' in self._info.get('user_sex', ''):
                             self._info['user_sex'] =  temp[1]
                         continue
                 if '图片模糊' in self._info.get('user_address', '') and 'user_address' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['user_address'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['user_address'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['user_address'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['user_address'][0])
+                    h1 = overlap['user_address'][0][k]
+                    w1 = overlap['user_address'][1][k]
 #                     print(i[1][0], h1/h, w1/w)
                     if h1/h>0.55 and w1/w>0.45:
                         if sum([1 for char in '性别出生年月日国CHINA' if char in i[1][0]])<2:
                             if len(address)==0:
-                                for char in self._char_address:
+                                for char in self._matcher.match(i[1][0])['address']:
                                     if i[1][0].startswith(char):
                                         address += (i[1][0][i[1][0].find(char)+len(char):]).strip()
-                                        self._axis['user_address'][1] = min(i[0][0][1], i[0][1][1])
+                                        self._axis['user_address'][1] = geometry['y'][k]
                                         self._axis['user_address'][2] = max(i[0][1][0], i[0][2][0])
                                         break
                                 if len(address)==0:
                                     address += i[1][0]
-                                    self._axis['user_address'][1] = min(i[0][0][1], i[0][1][1])
+                                    self._axis['user_address'][1] = geometry['y'][k]
                                     self._axis['user_address'][2] = max(i[0][1][0], i[0][2][0])
                                     fix_x.append(i[0][0][0])
                             else:
@@ -502,11 +524,11 @@ class OCRShenFenZheng():
                             self._axis['user_address'][0] = fix_x
 
                     fix_y = []
-                    for i in result[0]:
+                    for k, i in enumerate(result[0]):
                         if '性别' in i[1][0]:
-                            fix_y.append(min(i[0][0][1], i[0][1][1]))
-                        elif sum([1 for char in self._char_nation if char in i[1][0]])==1:
-                            fix_y.append(min(i[0][0][1], i[0][1][1]))
+                            fix_y.append(geometry['y'][k])
+                        elif len(self._matcher.match(i[1][0])['nation'])==1:
+                            fix_y.append(geometry['y'][k])
                     if len(fix_y)>0:
                         fix_y = sum(fix_y)/len(fix_y)
                         if 'user_sex' in self._axis:
@@ -556,7 +578,7 @@ class OCRShenFenZheng():
                     elif temp.endswith('公安'):
                         temp += '分局'
                     if [char for char in ['公安局', '分局'] if char in temp]:
-                        for char in self._char_organization:
+                        for char in self._matcher.match(temp)['organization']:
                             if char in temp:
                                 if temp[temp.find(char)+len(char):]!='':
                                     temp = temp[temp.find(char)+len(char):]
@@ -621,10 +643,12 @@ class OCRShenFenZheng():
         for i in self._axis:
             self._axis[i] = [int(max(0, j)) for j in self._axis[i]]
 
-    def draw_mask(self):
-        image = self._image.copy()
+    def draw_mask(self, image=None, axis=None, bgr=False):
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = rotate_image(read_image(image, bgr=bgr)[0], axis['angle']).copy()
         try:
-            t = [la.image.box_convert(self._axis[i], 'xyxy', 'axis') for i in self._axis if i in self._keys]
+            t = [la.image.box_convert(axis['axis'][i], 'xyxy', 'axis') for i in axis['axis'] if i in self._keys]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
         except:
@@ -693,33 +717,40 @@ class OCRShenFenZheng():
         return score
 
 def find_shenfenzheng(data, full_date=True, old=True):
-    temp = data.replace('x', 'X')
-    year = time.localtime(time.time()).tm_year
-    temp = ''.join([i for i in temp if i in '0123456789X'])
-    if len(temp)<15:
-        return []
-    if len(temp)>15:
-        for i in range(0,max(1,len(temp)-17)):
-            t = ''.join([j for j in temp[i:i+18] if j in '0123456789X'])
-            if 'X' in t:
-                if not (t.count('X')==1 and t.endswith('X')):
-                    continue
-            if len(t)==17:
-                if t[6:8] in ['19', '20']:
-                    t = t+'X'
-                else:
-                    t = ('3' if int(t[0])>5 else '1')+t
-            if len(t)==18:
-                if 1900<int(t[6:10])<year and 0<int(t[10:12])<13 and 0<int(t[12:14])<32:
-                    if not full_date:
-                        return [t, '男' if int(t[16])%2 else '女', f"{t[6:10]}年{int(t[10:12])}月{int(t[12:14])}日"]
-                    return [t, '男' if int(t[16])%2 else '女', f"{t[6:10]}年{t[10:12]}月{t[12:14]}日"]
-    elif old:
-        for i in range(0,len(temp)-14):
-            t = ''.join([j for j in temp[i:i+15] if j in '0123456789'])
-            if len(t)==15 and 0<int(t[8:10])<13 and 0<int(t[10:12])<32:
-                if not full_date:
-                    return [t, '男' if int(t[-1])%2 else '女', f"19{t[6:8]}年{int(t[8:10])}月{int(t[10:12])}日"]
-                return [t, '男' if int(t[-1])%2 else '女', f"19{t[6:8]}年{t[8:10]}月{t[10:12]}日"]
+    """`[number, sex, born, read]` of the first ID number in `data`, or [].
+
+    `read` is False when the number had to be completed from 17 characters (with an 'X' check
+    character, or a guessed leading digit) or is a 15-digit number, so its checksum proves nothing.
+    """
+    temp = ''.join([i for i in data.replace('x', 'X') if i in '0123456789X'])
+    read = len(temp)>=18
+    if len(temp)==17:
+        if 'X' in temp[:-1]:
+            return []
+        if temp[6:8] in ['19', '20'] and temp[-1]!='X':
+            temp = temp+'X'
+        else:
+            temp = ('3' if int(temp[0])>5 else '1')+temp
+    if len(temp)>=18:
+        hit = find_idcard(temp)
+        if hit is None:
+            return []
+        t = temp[hit[0]:hit[0]+18]
+        if not full_date:
+            return [t, '男' if int(t[16])%2 else '女', f"{t[6:10]}年{int(t[10:12])}月{int(t[12:14])}日", read]
+        return [t, '男' if int(t[16])%2 else '女', f"{t[6:10]}年{t[10:12]}月{t[12:14]}日", read]
+    elif old and len(temp)==15 and 'X' not in temp:
+        t = temp
+        if 0<int(t[8:10])<13 and 0<int(t[10:12])<32:
+            if not full_date:
+                return [t, '男' if int(t[-1])%2 else '女', f"19{t[6:8]}年{int(t[8:10])}月{int(t[10:12])}日", False]
+            return [t, '男' if int(t[-1])%2 else '女', f"19{t[6:8]}年{t[8:10]}月{t[10:12]}日", False]
     return []
+
+
+def user_number_valid(text):
+    """Crop retry check for `user_number`: all 18 characters of a checksum-valid ID number were read."""
+    temp = find_shenfenzheng(text)
+    return bool(temp) and temp[3] and idcard_valid(temp[0])
+
 # model = OCRShenFenZheng()
\ No newline at end of file
@@ -1,19 +1,28 @@
+import functools
+import re
 import time
 
-import paddleocr
 import linora as la
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, stateless, OCRMixin, read_image, fit_side, scale_axis, image_array, crop_array, rotate_image, line_geometry
+from tensormodel._ocr_match import KeywordMatcher
+from tensormodel._ocr_normalize import make_table, normalize, date_tail
+
 __all__ = ['OCRWanShuiPiao']
 
+_tax_date_table = make_table(delete=' ：')
+
 
-class OCRWanShuiPiao():
-    def __init__(self, model=True, name_list=None, remark_function=None):
+class OCRWanShuiPiao(OCRMixin):
+    def __init__(self, model=True, name_list=None, remark_function=None, decode_side=None, side_range=(1280, 2400)):
         if model==True:
-            self._model = paddleocr.PaddleOCR(show_log=False)
+            self._model = get_engine()
         elif model:
             self._model = model
         else:
             self._model = None
+        self._decode_side = decode_side
+        self._side_range = side_range
         self._remark_function = remark_function
         self._keys = ['tax_date', 'tax_organ', 'tax_user_id', 'tax_user_name', 
                       'tax_class', 'tax_amount', 'tax_ticket_filler']
@@ -43,16 +52,17 @@ class OCRWanShuiPiao():
                 self._char_tax_class.append((i, list(range(1, len(i)+1))[-2:]))
             else:
                 self._char_tax_class.append((i, list(range(1, len(i)+1))[max(len(i),4)-3:]))
+        self._matcher = KeywordMatcher({i:getattr(self, '_char_'+i) for i in ['tax_date', 'tax_organ', 'tax_user_id', 'tax_user_name', 'tax_amount', 'tax_ticket_filler']})
         
-    def predict(self, image, axis=False, model=None):
+    @stateless
+    def predict(self, image, axis=False, model=None, bgr=False):
         self._show_axis = axis
         self._info = '图片模糊或非税票图片'
         self._error = '图片模糊或非税票图片'
         
-        if isinstance(image, str):
-            self._image = la.image.color_convert(la.image.read_image(image))
-        else:
-            self._image = image
+        self._source, self._source_scale = read_image(image, self._decode_side, bgr)
+        self._image, self._scale = fit_side(self._source, self._side_range)
+        self._scale *= self._source_scale
         self._fit_direction(self._model if model is None else model)
         if isinstance(self._info, str):
             if self._show_axis:
@@ -65,16 +75,17 @@ class OCRWanShuiPiao():
         error_list = [i for i in self._info if '图片模糊' in self._info[i]]
         if error_list:
             self._result_crop = []
+            array = image_array(self._image)
             tax_remark_logic = True
             for i in error_list:
                 if i.startswith('tax_remark') and tax_remark_logic and 'tax_remark' in self._axis:
-                    image = la.image.crop(self._image, self._axis['tax_remark'])
+                    image = crop_array(array, self._axis['tax_remark'])
                     tax_remark_logic = False
                 elif i in self._axis:
-                    image = la.image.crop(self._image, self._axis[i])
+                    image = crop_array(array, self._axis[i])
                 else:
                     continue
-                t = (self._model if model is None else model).ocr(la.image.image_to_array(image), cls=False)
+                t = (self._model if model is None else model).ocr(image, cls=False)
                 if t[0]:
                     for j in t[0]:
                         if i.startswith('tax_remark'):
@@ -90,14 +101,12 @@ class OCRWanShuiPiao():
         self._error = '图片模糊' if [1 for i in self._info if '图片模糊' in self._info[i]] else 'ok'
         self._info = {i:('' if '图片模糊' in j else j) for i,j in self._info.items()}
         if self._show_axis:
-            return {'data':self._info, 'axis':self._axis, 'angle':self._angle, 'error':self._error}
+            return {'data':self._info, 'axis':scale_axis(self._axis, self._scale), 'angle':self._angle, 'error':self._error}
         else:
             return {'data':self._info, 'angle':self._angle, 'error':self._error}
         
     def _fit_direction(self, model):
-        for angle in [0, 90, 270, 180]:
-            image = la.image.rotate(self._image, angle, expand=True)
-            self._result = model.ocr(la.image.image_to_array(image), cls=False)
+        for angle, image, self._result in ocr_direction(model, self._image):
             index1 = ['品目名称', '税款所属时期', '实缴(退)金额', '实缴（退）金额', '入(退)库日期', '入（退）库日期']
             rank = [0,0,0,0,0,0,0]
             for r, i in enumerate(self._result[0], start=1):
@@ -113,7 +122,7 @@ class OCRWanShuiPiao():
                 elif sum([1 for char in index1 if char in i[1][0]]):
                     if rank[3]==0:
                         rank[3] = r
-                elif sum([1 for char in self._char_tax_amount if char in i[1][0]]):
+                elif len(self._matcher.match(i[1][0])['tax_amount']):
                     if rank[4]==0:
                         rank[4] = r
                 elif '填票人' in i[1][0]:
@@ -124,11 +133,11 @@ class OCRWanShuiPiao():
                         rank[6] = r
             rank = [i for i in rank if i>0]
             if rank==sorted(rank) and len(rank)>1:
-                self._image = image
+                self._image = image()
                 self._angle = angle
                 self._info = {i:'图片模糊' for i in self._name_list}
                 if self._remark_function is not None:
-                    self._keys.append('tax_remark')
+                    self._keys = self._keys+['tax_remark']
                 break
     
     def _fit_axis(self):
@@ -144,7 +153,7 @@ class OCRWanShuiPiao():
             x = min(i[0][0][0], i[0][3][0])
             y = min(i[0][0][1], i[0][1][1])
             if 'tax_date' not in axis_true:
-                for char in self._char_tax_date:
+                for char in self._matcher.match(i[1][0])['tax_date']:
                     if char in i[1][0]:
                         if len(i[1][0])>5:
                             w = w*len(char)/(len(i[1][0])+1)
@@ -156,7 +165,7 @@ class OCRWanShuiPiao():
                 if 'tax_date' in axis_true:
                     continue
             if 'tax_organ' not in axis_true and tax_organ_logic:
-                for char in self._char_tax_organ:
+                for char in self._matcher.match(i[1][0])['tax_organ']:
                     if char in i[1][0]:
                         if len(i[1][0])>4:
                             w = w*len(char)/(len(i[1][0])+0.5)
@@ -170,7 +179,7 @@ class OCRWanShuiPiao():
                     tax_organ_logic = False
                     continue
             if 'tax_user_id' not in axis_true:
-                for char in self._char_tax_user_id:
+                for char in self._matcher.match(i[1][0])['tax_user_id']:
                     if char in i[1][0]:
                         if len(i[1][0])>6:
                             w = w*len(char)/(len(i[1][0])+0.5)
@@ -184,7 +193,7 @@ class OCRWanShuiPiao():
                 if 'tax_user_id' in axis_true:
                     continue
             if 'tax_user_name' not in axis_true:
-                for char in self._char_tax_user_name:
+                for char in self._matcher.match(i[1][0])['tax_user_name']:
                     if char in i[1][0]:
                         if len(i[1][0])>5:
                             w = w*len(char)/(len(i[1][0])+0.5)
@@ -263,7 +272,7 @@ class OCRWanShuiPiao():
                 tax_organ_logic = False
                 continue
             if 'tax_amount' not in axis_true:
-                for char in self._char_tax_amount:
+                for char in self._matcher.match(i[1][0])['tax_amount']:
                     if char in i[1][0]:
                         if len(i[1][0])>4:
                             w = w*len(char)/(len(i[1][0])+1)
@@ -276,7 +285,7 @@ class OCRWanShuiPiao():
                         tax_organ_logic = False
                         break
             if 'tax_ticket_filler' not in axis_true:
-                for char in self._char_tax_ticket_filler:
+                for char in self._matcher.match(i[1][0])['tax_ticket_filler']:
                     if char in i[1][0]:
                         axis_true['tax_ticket_filler'] = [x-w*0.5, y+h, x+w*1.5, y+h*3]
                         axis_dict['tax_amount'].append(([x+w*5.5, y-h*3.5, x+w*7.5, y-h*2], 0.4))
@@ -304,16 +313,17 @@ class OCRWanShuiPiao():
         if len(result)==0:
             return 0
         axis_true = {i:tuple(axis[i]) for i in axis}
+        geometry, overlap = line_geometry(result[0], axis_true)
         
         tax_date = ''
         tax_class = []
         if self._remark_function is not None:
             tax_remark = ''
-        for i in result[0]:
-            h = max((i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2, 1)
-            w = max((i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2, 1)
-            x = min(i[0][0][0], i[0][3][0])
-            y = min(i[0][0][1], i[0][1][1])
+        for k, i in enumerate(result[0]):
+            h = max(geometry['h'][k], 1)
+            w = max(geometry['w'][k], 1)
+            x = geometry['x'][k]
+            y = geometry['y'][k]
             if '图片模糊' in self._info.get('tax_organ', ''):
                 temp = self._analysis_tax_organ(i[1][0])
                 if '图片模糊' not in temp:
@@ -321,15 +331,15 @@ class OCRWanShuiPiao():
                     self._axis['tax_organ'] = self._axis['tax_organ'][:2]+i[0][2]
                     continue
             if '图片模糊' in self._info.get('tax_date', ''):
-                if sum([1 for char in self._char_tax_date if char in i[1][0]])>0:
-                    for char in self._char_tax_date:
+                if len(self._matcher.match(i[1][0])['tax_date'])>0:
+                    for char in self._matcher.match(i[1][0])['tax_date']:
                         if char in i[1][0]:
                             tax_date += ''.join([j for j in i[1][0][i[1][0].find(char)+len(char):] if j in '0123456789年月日'])
                             break
                     continue
                 if 'tax_date' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['tax_date'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['tax_date'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['tax_date'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['tax_date'][0])            
+                    h1 = overlap['tax_date'][0][k]
+                    w1 = overlap['tax_date'][1][k]
                     if h1/h>0.6 and w1/w>0.6:
                         temp = i[1][0].replace(' ', '').replace('：', '').replace(':', '')
                         if len(temp)==sum([1 for char in temp if char in '0123456789年月日']):
@@ -338,23 +348,23 @@ class OCRWanShuiPiao():
         #                       self._axis['tax_date'] = [x, y]+i[0][2]
                                 continue
             if '图片模糊' in self._info.get('tax_user_id', ''):
-                if sum([1 for char in self._char_tax_user_id if char in i[1][0]])>0:
-                    for char in self._char_tax_user_id:
+                if len(self._matcher.match(i[1][0])['tax_user_id'])>0:
+                    for char in self._matcher.match(i[1][0])['tax_user_id']:
                         if char in i[1][0] and len(i[1][0][i[1][0].find(char)+len(char):])>1:
                             self._info['tax_user_id'] = i[1][0][i[1][0].find(char)+len(char):].strip()
                             self._axis['tax_user_id'] = [self._axis['tax_user_id'][0], i[0][0][1]]+i[0][2]
                             break
                     continue
                 if 'tax_user_id' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['tax_user_id'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['tax_user_id'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['tax_user_id'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['tax_user_id'][0])            
+                    h1 = overlap['tax_user_id'][0][k]
+                    w1 = overlap['tax_user_id'][1][k]
                     if h1/h>0.6 and w1/w>0.6:
                         self._info['tax_user_id'] = i[1][0]
                         self._axis['tax_user_id'] = [x, y]+i[0][2]
                         continue
             if '图片模糊' in self._info.get('tax_user_name', ''):
-                if sum([1 for char in self._char_tax_user_name if char in i[1][0]])>0:
-                    for char in self._char_tax_user_name:
+                if len(self._matcher.match(i[1][0])['tax_user_name'])>0:
+                    for char in self._matcher.match(i[1][0])['tax_user_name']:
                         temp = la.text.sequence_preprocess(i[1][0][i[1][0].find(char)+len(char):])
                         if char in i[1][0] and len(temp)>1:
                             if len(temp)==4:
@@ -369,8 +379,8 @@ class OCRWanShuiPiao():
                 if '图片模糊' not in self._info['tax_user_name']:
                     continue
                 if 'tax_user_name' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['tax_user_name'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['tax_user_name'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['tax_user_name'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['tax_user_name'][0])            
+                    h1 = overlap['tax_user_name'][0][k]
+                    w1 = overlap['tax_user_name'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and len(i[1][0])>1 and sum([1 for char in i[1][0] if char in '税务机所：:市区地（）()'])<1:
                         temp = la.text.sequence_preprocess(i[1][0])
                         if len(temp)>1:
@@ -384,8 +394,8 @@ class OCRWanShuiPiao():
                             self._axis['tax_user_name'] = [x, y]+i[0][2]
                             continue
             if '图片模糊' in self._info.get('tax_class', '') and 'tax_class' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['tax_class'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['tax_class'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['tax_class'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['tax_class'][0])            
+                h1 = overlap['tax_class'][0][k]
+                w1 = overlap['tax_class'][1][k]
                 temp = ''.join([j for j in i[1][0] if j not in '0123456789|']).replace(' ', '').replace('臧', '城').replace('时', '附').replace('锐', '税')
                 temp = la.text.sequence_preprocess(temp)
                 for char in self._char_class:
@@ -416,8 +426,8 @@ class OCRWanShuiPiao():
                             self._axis['tax_remark'][1] = i[0][2][1]+h*0.25
                         continue
                 if 'tax_amount' in axis_true:
-                    h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['tax_amount'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['tax_amount'][1])
-                    w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['tax_amount'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['tax_amount'][0])            
+                    h1 = overlap['tax_amount'][0][k]
+                    w1 = overlap['tax_amount'][1][k]
                     if h1/h>0.6 and w1/w>0.6 and len(i[1][0])>2:
                         temp = self._analysis_tax_amount(i[1][0])
                         if '图片模糊' not in temp:
@@ -427,15 +437,15 @@ class OCRWanShuiPiao():
                                 self._axis['tax_remark'][1] = i[0][2][1]+h*0.25
                             continue
             if '图片模糊' in self._info.get('tax_ticket_filler', '') and 'tax_ticket_filler' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['tax_ticket_filler'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['tax_ticket_filler'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['tax_ticket_filler'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['tax_ticket_filler'][0])            
+                h1 = overlap['tax_ticket_filler'][0][k]
+                w1 = overlap['tax_ticket_filler'][1][k]
                 if h1/h>0.6 and w1/w>0.6:
                     self._info['tax_ticket_filler'] = i[1][0]
                     self._axis['tax_ticket_filler'] = [x, y]+i[0][2]
                     continue
             if 'tax_remark' in axis_true:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['tax_remark'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['tax_remark'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['tax_remark'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['tax_remark'][0])            
+                h1 = overlap['tax_remark'][0][k]
+                w1 = overlap['tax_remark'][1][k]
                 if h1/h>0.6 and w1/w>0.6:
                     tax_remark += i[1][0]
                     continue
@@ -464,7 +474,7 @@ class OCRWanShuiPiao():
     
     def _analysis_tax_date(self, data):
         date_info = '图片模糊:未识别出填发日期'
-        date = data.replace(' ', '').replace('：', '')
+        date = normalize(data, _tax_date_table)
         index = [r+1 for r,i in enumerate(date) if i in '年月日']
         if len(index)==3:
             s = [date[:index[0]], date[index[0]:index[1]], date[index[1]:]]
@@ -498,14 +508,9 @@ class OCRWanShuiPiao():
                     if i[0][0][1]>self._axis['tax_remark'][1]:
                         continue
                 temp = i[1][0].replace(' ', '')
-                if len(temp)==8 and sum([1 for j in temp if j in '0123456789'])==8:
-                    date_info = f"{temp[:4]}年{int(temp[4:6])}月{int(temp[6:8])}日"
-                elif len(temp)==10 and sum([1 for j in temp if j in '0123456789'])==8 and temp[4]=='-' and temp[7]=='-':
-                    date_info = f"{temp[:4]}年{int(temp[5:7])}月{int(temp[8:10])}日"
-                elif len(temp)>19 and sum([1 for j in temp[-8:] if j in '0123456789'])==8:
-                    date_info = f"{temp[-8:][:4]}年{int(temp[-8:][4:6])}月{int(temp[-8:][6:8])}日"
-                elif len(temp)>24 and sum([1 for j in temp[-10:] if j in '0123456789'])==8 and temp[-10:][4]=='-' and temp[-10:][7]=='-':
-                    date_info = f"{temp[-10:][:4]}年{int(temp[-10:][5:7])}月{int(temp[-10:][8:10])}日"
+                t = date_tail.search(temp)
+                if t and (t.start()==0 or t.start()>(14 if t.group(2) else 11)):
+                    date_info = f"{t.group(1)}年{int(t.group(3))}月{int(t.group(4))}日"
                 if '图片模糊' not in date_info:
                     month = date_info.split('月')[0].split('年')[-1]
                     day = date_info.split('日')[0].split('月')[-1]
@@ -600,10 +605,12 @@ class OCRWanShuiPiao():
             organ = '图片模糊:未识别出税务机关'
         return organ
     
-    def draw_mask(self):
-        image = self._image.copy()
+    def draw_mask(self, image=None, axis=None, bgr=False):
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = rotate_image(read_image(image, bgr=bgr)[0], axis['angle']).copy()
         try:
-            t = [la.image.box_convert(self._axis[i], 'xyxy', 'axis') for i in self._axis if i in self._keys]
+            t = [la.image.box_convert(axis['axis'][i], 'xyxy', 'axis') for i in axis['axis'] if i in self._keys]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
         except:
@@ -667,12 +674,9 @@ class OCRWanShuiPiao():
         return score
 
 def remark(remark):
-    s = remark.replace('：',':').replace('，','').replace(' ','').replace(',','')
+    s = normalize(remark, _remark_table)
     try:
-        amount = s
-        for i,j in [('机','税'), ('积','税'), ('全','金'), ('企','金'), ('题','额'), ('频','额'), ('卒','率'), 
-                    ('车','率'), ('事','率'), ('单','率'), ('Q','0'), ('o','0')]:
-            amount = amount.replace(i, j)
+        amount = normalize(s, _remark_amount_table)
         amount = amount[amount.find('计税金额'):]
         for i in ['共有人', '房源', '房屋产权证书号']:
             if i in amount:
@@ -686,20 +690,15 @@ def remark(remark):
             amount = amount+'税率:'
         
         temp = amount[::-1]
-        index = -1
-        for r,i in enumerate(temp[:temp.find('率税')]):
-            if i not in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', ':', '.', '%']:
-                index = r
-        amount = temp[index+1:][::-1]
+        index = _remark_rate_tail.search(temp[:temp.find('率税')])
+        amount = temp[(index.start() if index else -1)+1:][::-1]
         
         if amount.endswith('率'):
             amount = amount+':'
         if amount.endswith(':'):
             amount = amount+('5.0' if amount.split('计税金额:')[-1].split('税率')[0]=='0'else '0.03')
             
-        for i in amount:
-            if i not in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '计', '税', '金', '额', ':', '.', '率', '%']:
-                amount = amount.replace(i, '')
+        amount = normalize(amount, _remark_keep_table)
         for i,j in [('.计','计'), (':', ''), ('率00','率0.0'), ('额','额:'), ('率', '率:')]:
             amount = amount.replace(i, j)
         
@@ -722,7 +721,6 @@ def remark(remark):
     try:
         address = s
         address_info = ['街','区','院','室','楼','层','门','号','幢','栋','单元']
-        address_info_filter = '0123456789'+''.join(address_info)
         for i in ['地址', '位置', '址:', '置:']:
             if i in address:
                 address = address[address.find(i)+len(i):]
@@ -741,9 +739,7 @@ def remark(remark):
         index = -1
         for k in ['室', '楼', '层', '门', '号']:
             if k in temp:
-                for r,i in enumerate(temp[:temp.find(k)]):
-                    if i in [',', '(', '（']:
-                        index = r
+                index = max([temp.rfind(i, 0, temp.find(k)) for i in ',(（'])
                 address = temp[index+1:][::-1]
                 break
 
@@ -756,7 +752,7 @@ def remark(remark):
         
         if sum([1 for i in address_info+['路'] if i in address])<3:
             address = ''
-        elif sum([1 for i in address if i not in address_info_filter])<3:
+        elif len(normalize(address, _remark_address_table))<3:
             address = ''
         elif [1 for i in ['房源', '房屋', '税票'] if i in address]:
             address = ''
@@ -764,47 +760,74 @@ def remark(remark):
         address = ''
     return {'tax_remark_amount':amount, 'tax_remark_address':address}
 
+
 def amount_transform(data):
     temp = data.replace(',', '')
     if '.' not in temp:
         temp += '.00'
     if temp[0] in '0123456789':
         temp = '¥'+temp
-    trans_number = {'0':'', '1': '壹', '2': '贰', '3': '叁', '4': '肆', '5': '伍', '6': '陆', '7': '柒', '8': '捌', '9': '玖'}
-    trans_str = {'¥':'(人民币)', '$':'(美元)'}
-    amount = []
-    if sum([1 for i in temp[1:-3]+temp[-2:] if i in '0123456789'])==len(temp)-2 and temp[1]!='0':
-        cla = trans_str[temp[0]]
-        temp = temp[1:]
-        for i,j,k in [(-11, -15, '亿'), (-7, -11, '万'), (-3, -7, '元')]:
-            t = (4-len(temp[j:i]))*'0'+temp[j:i]
-            if temp[j:i]!='':
-                if t[0]!='0':
-                    amount.append(trans_number[t[0]]+'仟')
-                else:
-                    amount.append('零')
-                if t[1]!='0':
-                    amount.append(trans_number[t[1]]+'佰')
-                elif t[0]!='0':
-                    amount.append('零')
-                if t[2]!='0':
-                    amount.append(trans_number[t[2]]+'拾')
-                elif t[1]!='0':
-                    amount.append('零')
-                amount.append(trans_number[t[3]]+k)
-        
-        if temp[-2:]=='00':
-            amount.append('整')
-        else:
-            if temp[-2]!='0':
-                amount.append(f"{trans_number[temp[-2]]}角")
-            if temp[-1]!='0':
-                amount.append(f"{trans_number[temp[-1]]}分")
-        if amount[0]=='零':
-            amount = amount[1:]
-        amount = cla+''.join(amount)
-        for i,j in [('零万', '万'), ('零元', '元'), ('零亿', '亿'), ('拾亿', '拾亿零'), ('拾万', '拾万零')]:
-            amount = amount.replace(i,j)
-    else:
-        amount = ''
+    m = _amount_pattern.fullmatch(temp)
+    if m is None:
+        return ''
+    currency, integer, cents = m.groups()
+    integer = (integer or '')[-12:]
+    n = (len(integer)+3)//4
+    integer = integer.rjust(n*4, '0')
+    amount = ''.join([_amount_group(integer[r*4:r*4+4], '亿万元'[3-n+r], r==0) for r in range(n)])
+    return _amount_currency[currency]+amount+_amount_cents[cents]
+
+
+def amount_transform_batch(data):
+    """`amount_transform` over a column, returning a list.
+
+    `data` is a list, a NumPy string array or an Arrow array (e.g. a column of `pyarrow.parquet.read_table`);
+    missing values give ''. Each distinct value is converted once.
+    """
+    column = _column(data)
+    cache = {i:amount_transform(i) for i in set(column) if i}
+    return [cache.get(i, '') for i in column]
+
+
+def remark_batch(data):
+    """`remark` over a column (as in `amount_transform_batch`), returning
+    `{'tax_remark_amount':[...], 'tax_remark_address':[...]}`."""
+    column = _column(data)
+    cache = {i:remark(i) for i in set(column)}
+    return {i:[cache[j][i] for j in column] for i in ['tax_remark_amount', 'tax_remark_address']}
+
+
+def _column(data):
+    if hasattr(data, 'to_pylist'):
+        data = data.to_pylist()
+    elif hasattr(data, 'tolist'):
+        data = data.tolist()
+    return [i.decode('utf-8') if isinstance(i, bytes) else (i if isinstance(i, str) else '') for i in data]
+
+
+@functools.lru_cache(maxsize=None)
+def _amount_group(group, unit, first=False):
+    t = [int(i) for i in group]
+    amount = _amount_digit[t[0]]+'仟' if t[0] else '零'
+    amount += _amount_digit[t[1]]+'佰' if t[1] else ('零' if t[0] else '')
+    amount += _amount_digit[t[2]]+'拾' if t[2] else ('零' if t[1] else '')
+    amount += (_amount_digit[t[3]] if t[3] else '')+unit
+    if first and not t[0]:
+        amount = amount[1:]
+    if amount.endswith('零'+unit):
+        amount = amount[:-2]+unit
+    if unit!='元' and amount.endswith('拾'+unit):
+        amount += '零'
     return amount
+
+
+_remark_table = make_table({'：':':'}, delete='， ,')
+_remark_amount_table = make_table({'机':'税', '积':'税', '全':'金', '企':'金', '题':'额', '频':'额', '卒':'率', 
+                                   '车':'率', '事':'率', '单':'率', 'Q':'0', 'o':'0'})
+_remark_keep_table = make_table(keep='0123456789计税金额:.率%')
+_remark_address_table = make_table(delete='0123456789街区院室楼层门号幢栋单元')
+_remark_rate_tail = re.compile('[^0-9:.%][0-9:.%]*$')
+_amount_pattern = re.compile('([¥$])([1-9][0-9]*)?[^0-9]([0-9]{2})')
+_amount_digit = '零壹贰叁肆伍陆柒捌玖'
+_amount_currency = {'¥':'(人民币)', '$':'(美元)'}
+_amount_cents = {f'{i:02d}':((_amount_digit[i//10]+'角' if i//10 else '')+(_amount_digit[i%10]+'分' if i%10 else '') if i else '整') for i in range(100)}
@@ -1,20 +1,26 @@
 import time
 
-import paddleocr
 import linora as la
 from fuzzywuzzy import fuzz
 
+from tensormodel._ocr_engine import get_engine, ocr_direction, ocr_fields, text_height, stateless, OCRMixin, read_image, fit_side, scale_axis, image_array, crop_array, crop_variants, rotate_image, line_geometry
+from tensormodel._ocr_match import KeywordMatcher, FuzzyIndex, PrefixTrie
+from tensormodel._ocr_check import luhn_valid
+
 __all__ = ['OCRYinHangKa']
 
 
-class OCRYinHangKa():
-    def __init__(self, model=True, name_list=None):
+class OCRYinHangKa(OCRMixin):
+    def __init__(self, model=True, name_list=None, aug_workers=None, decode_side=None, side_range=(640, 1280)):
         if model==True:
-            self._model = paddleocr.PaddleOCR(show_log=False)
+            self._model = get_engine()
         elif model:
             self._model = model
         else:
             self._model = None
+        self._decode_side = decode_side
+        self._side_range = side_range
+        self._aug_workers = aug_workers
         self._keys = ['bank_name', 'bank_number', 'bank_type']
         if name_list is None:
             name_list = self._keys.copy()
@@ -75,16 +81,38 @@ class OCRYinHangKa():
         self._char_bank_name += [i+'村镇银行' for i in cunzhenyinhang.split(',')]
         hezuoshe = '汕头市澄海,深泽县,汕头经济特区,无极县,汕头市金砂,石家庄市藁城,汕头市岐山,石家庄市栾城,汕头市舵浦,赵县,汕头市下蓬,新乐市,汕头市珠池,高邑县,汕头市碧石,赞皇县,汕头市河浦,行唐县,韶关市区,石家庄市矿区,韶关市曲江区,蔚县,吴川市,怀安县,肇庆市鼎湖区,赤城县,壮族自治区,康保县,南宁市区,尚义县,南宁市邕宁区,隆化县,南宁市武鸣区,平泉市,横县,兴隆县,宾阳县,承德市郊区,柳州市区,秦皇岛市区,三江侗族自治县,抚宁县,融水苗族自治县,昌黎县,梧州市区,青龙满族自治县,苍梧县,乐亭县,藤县,迁西县,河池市区,遵化市,环江毛南族自治县,廊坊市城郊,南丹县,大城县,天峨县,雄县,东兰县,唐县,凤山县,阜平县,都安瑶族自治县,曲阳县,大化瑶族自治县,涞源县,德保县,博野县,北海市区,望都县,合浦县,安新县,钦州市区,顺平县,灵山县,易县,防城港市区,容城县,防城港市防城区,定兴县,贵港市区,保定市徐水区,桂平市,保定市清苑区,保定市满城区,平南县,玉林市区,高阳县,兴业县,海兴县,容县,东光县,北流市,河间市,博白县,吴桥县,武宣县,盐山县,金秀瑶族自治县,肃宁县,忻城县,孟村回族自治县,合山市,泊头市,钟山县,任丘市,沧县,海口市,青县,保亭黎族苗族自治县,故城县,昌江黎族自治县,饶阳县,儋州市,武邑县,定安县,隆尧县,东方市农村信用合用联社平乡县,乐东黎族自治县,南宫市,陵水黎族自治县,内丘县,琼海市,新河县,威县,琼中黎族苗族自治县,股份有限公司五指山市,成安县,阿坝州,磁县,通江县,邱县,南江县,临漳县,平昌县,曲周县,开江县,魏县,中江县,邯郸市城区,甘孜州,馆陶县,旺苍县,广平县,乐山市五通桥区,肥乡县,乐山市沙湾区,武安市,乐山市金口河区,永年县,沐川县,邯郸市峰峰矿区,马边彝族自治县,夹江县,忻州市,井研县,吕梁市,峨边彝族自治县,运城市,洪雅县,陵川县,盐亭县,应县,绵阳市涪城区,太原市城区,北川羌族自治县,娄烦县,江油市,大同市云州区,绵阳市游仙区,阳高县,资中县,天镇县,蓬安县,浑源县,天全县,广灵县,芦山县,平定县,宝兴县,祁县,荥经县,石楼县,汉源县,交口县,石棉县,汾阳市,荣县,文水县,方山县,临县,镇宁布依族苗族自治县,安顺市平坝区,离石区,纳雍县,中阳县,威宁县,霍州市,金沙县,翼城县,开阳县,古县,六枝特区,吉县,水城县,蒲县,盘县,定襄县,雷山县,代县,锦屏县,偏关县,台江县,自治区,榕江县,额济纳旗,岑巩县,阿拉善右旗,施秉县,乌拉特后旗,长顺县,磴口县,罗甸县,乌拉特中旗,册亨县,达尔罕茂明安联合旗,望谟县,固阳县,江口县,包头市南郊,石阡县,喀喇沁旗,德江县,赤峰市红山区,沿河土家族自治县,敖汉旗,松桃苗族自治县,翁牛特旗,赤水市,巴林左旗,绥阳县,巴林右旗,习水县,乌审旗,正安县,准格尔旗,达拉特旗,伊金霍洛旗矿区,鲁甸县,准格尔煤田,巧家县,杭锦旗,盐津县,阿荣旗,大关县,莫力达瓦达斡尔族自治旗,永善县,新巴尔虎右旗,绥江县,新巴尔虎左旗,镇雄县,根河市,曲靖市,扎兰屯市,富源县,陈巴尔虎旗,会泽县,额尔古纳市,曲靖市马龙区,武川县,曲靖市麒麟区,和林格尔县,师宗县,清水河县,宣威市,土默特左旗,曲靖市沾益区,开鲁县,峨山彝族自治县,科尔沁左翼后旗,元江哈尼族彝族傣族自治县,科尔沁左翼中旗,玉溪市江川区,扎鲁特旗,澄江县,通辽市科尔沁区,个旧市,库伦旗,开远市,霍林郭勒市,石屏县,化德县,泸西县,卓资县,屏边县,凉城县,红河县,四子王旗,元阳县,商都县,绿春县,察哈尔右翼后旗,金平苗族瑶族傣族自治县,兴和县,丘北县,丰镇市,砚山县,察哈尔右翼中旗,西畴县,镶黄旗,富宁县,平顶山市石龙区,郏县,鲁山县,平顶山市新华区,夏邑县,虞城县,睢县,宁陵县,新乡市凤泉区,封丘县,新乡县,卫辉市,信阳市明港,信阳市平桥区,商城县,信阳市源河区,禹州市,淮阳县,西华县,郸城县,临颍县,舞阳县,漯河市源汇区,漯河市郾城区,漯河市召陵区,濮阳县,十堰市,茂名市,韶关市,湛江市,惠来县,阳江市海陵区,云浮市云城区,云浮市云安区,郁南县,汕头市潮阳,玛纳斯县,伊吾县,巴里坤哈萨克自治县,民丰县,于田县,策勒县,洛浦县,和田市,皮山县,和田县,墨玉县,叶城县,泽普县,麦盖提县,疏附县,伽师县,莎车县,塔什库尔干县,疏勒县,英吉沙县,巴楚县,岳普湖县,阿克陶县,阿图什市,阿合奇县,乌恰县,裕民县,托里县,和布克赛尔蒙古自治县,额敏县,鄯善县,托克逊县,吐鲁番市,察布查尔县,尼勒克县,新源县,巩留县,特克斯县,象山县,宁波市市区,阿巴嘎旗,麻栗坡县,正蓝旗,墨江哈尼族自治县,苏尼特右旗,澜沧拉祜族自治县,正镶白旗,西盟佤族自治县,东乌珠穆沁旗,多伦县,苏尼特左旗,宁洱哈尼族彝族自治县,江城哈尼族彝族自治县,镇沅彝族哈尼族拉祜族自治县,扎赉特旗,景谷傣族彝族自治县,科尔沁右翼前旗,勐海县,科尔沁右翼中旗,牟定县,乌兰浩特市,双柏县,突泉县,武定县,姚安县,沈阳市,永仁县,辽中县,漾濞彝族自治县,沈阳市苏家屯区,永平县,法库县,鹤庆县,康平县,弥渡县,台安县,南涧彝族自治县,抚顺县,剑川县,抚顺市顺城区,保山市隆阳区,本溪市市区,瑞丽市,凌海市,华坪县,义县,宁蒗彝族自治县,北镇市,泸水市,黑山县,兰坪白族普米族自治县,阜新蒙古族自治县,福贡县,彰武县,铁岭县,贡山独龙族怒族自治县,德钦县,昌图县,维西傈僳族自治县,开原市,香格里拉市,铁岭市清河区,镇康县,调兵山市,耿马傣族佤族自治县,西丰县,永德县,铁岭市银州区,双江拉祜族佤族布朗族傣族自治县,朝阳县,沧源佤族自治县,北票市,昆明市,凌源市,昆明市西山区,喀左县,安宁市,朝阳市龙城区,石林彝族自治县,朝阳市双塔区,昆明市五华区,盘锦市双台子区,富民县,盘锦市兴隆台区,禄劝彝族苗族自治县,盘山县,宜良县,绥中县,昆明市东川区,建昌县,昆明市盘龙区,四平市城区,昆明市呈贡区,伊通满族自治县,昆明市晋宁区,双辽市,梨树县,宝鸡市陈仓区,梅河口市,岐山县,洮南市,扶风县,东辽县,宝鸡市金台区,乾安县,城固县,扶余市,汉中市汉台区,松原市宁江区,洋县,长岭县,勉县,长白朝鲜族自治县,佛坪县,抚松县,宁强县,留坝县,略阳县,哈尔滨市,西安市长安区,佳木斯市,商洛市商州区,牡丹江市,洛南县,齐齐哈尔市,宜君县,绥化市,铜川市王益区,鹤岗市市区,铜川市印台区,木兰县,铜川市耀州区,尚志市,潼关县,哈尔滨市阿城区,澄城县,依兰县,华阴市,巴彦县,合阳县,哈尔滨市双城区,富平县,哈尔滨市呼兰区,大荔县,富锦市,白水县,桦川县,蒲城县,佳木斯市郊区,渭南市临渭区,桦南县,渭南市华州区,穆棱市,乾县,林口县,礼泉县,宁安市,淳化县,海林市,武功县,牡丹江市城郊,旬邑县,勃利县,永寿县,七台河市区,兴平市,龙江县,泾阳县,拜泉县,三原县,依安县,延长县,双鸭山市市区,宜川县,肇东市,黄龙县,绥化市北林区,志丹县,海伦市,黄陵县,兰西县,延川县,望奎县,青冈县,铁力市,皋兰县,嘉荫县,永登县,金塔县,阿克塞县,肃北县,肃南裕固族自治县,闽侯县,白银区,永泰县,平川区,罗源县,景泰县,连江县,通渭县,闽清县,渭源县,武平县,漳县,长汀县,甘谷县,连城县,武山县,龙岩市永定区,清水县,浦城县,张家川回族自治县,松溪县,正宁县,政和县,镇原县,光泽县,合水县,顺昌县,华池县,邵武市,环县,南平市建阳区,庆城县,福鼎市,宕昌县,古田县,成县,寿宁县,文县,周宁县,徽县,柘荣县,临夏县,屏南县,永靖县,霞浦县,广河县,福安市,康乐县,仙游县,东乡族自治县,惠安县,和政县,德化县,积石山县,永春县,合作市,安溪县,舟曲县,明溪县,碌曲县,泰宁县,玛曲县,将乐县,迭部县,宁化县,卓尼县,永安市,夏河县,尤溪县,临潭县,建宁县,清流县,海东市乐都区,大田县,永宁县,平和县,石嘴山市惠农区,云霄县,青铜峡市,长泰县,红寺堡区,南靖县,隆德县,诏安县,维吾尔自治区,华安县,乌什县,东山县,阿瓦提县,漳浦县,库车县,沙雅县,潍坊市,拜城县,新和县,林州市,青河县,内黄县,福海县,淇县,吉木乃县,温县,布尔津县,焦作市马村区,哈巴河县,焦作市山阳区,且末县,焦作市中站区,若羌县,南阳市卧龙区,和静县,南阳市宛城区,焉耆回族自治县,唐河县,和硕县,方城县,温泉县,平顶山市市郊,精河县'
         self._char_bank_name += [i+'农村信用社' for i in hezuoshe.split(',')]
+        self._char_bank_bin = {
+            '中国工商银行':{'储蓄卡':['622202', '622203', '622208', '621226', '621288', '955880'], '信用卡':['427020', '427030', '530990']},
+            '中国农业银行':{'储蓄卡':['622848', '622845', '622846', '622841', '622823', '622821', '622827'], '信用卡':['622836', '622837']},
+            '中国银行':{'储蓄卡':['621660', '621661', '621663', '621666', '621667', '621668', '621669', '456351', '601382']},
+            '中国建设银行':{'储蓄卡':['621700', '436742', '622700', '622280', '621081', '621284', '621466', '621467', '621499']},
+            '交通银行':{'储蓄卡':['622260', '622262', '601428', '405512'], '信用卡':['622252', '622253']},
+            '中国邮政储蓄银行':{'储蓄卡':['621098', '622150', '622151', '622188', '621799', '620062', '955100']},
+            '招商银行':{'储蓄卡':['622588', '622580', '621483', '621485', '621486', '621286', '410062'], 
+                    '信用卡':['622575', '622576', '622578', '622581', '622582', '439225', '518710', '518718']},
+            '中信银行':{'储蓄卡':['622690', '622691', '622692', '622696', '622698', '433670', '433680']},
+            '中国光大银行':{'储蓄卡':['622660', '622661', '622662', '622663', '622664', '622665', '622666', '622667', '622668', '622669']},
+            '民生银行':{'储蓄卡':['622615', '622617', '622618', '622622', '415599', '421393', '421865', '427570', '427571', '472067', '472068']},
+            '浦发银行':{'储蓄卡':['622521', '622522', '622523', '622516', '622517', '622518', '456418', '498451']},
+            '兴业银行':{'储蓄卡':['622909', '622908', '438588', '438589']},
+            '广发银行':{'储蓄卡':['622568']},
+            '平安银行':{'储蓄卡':['622155', '622156', '622157', '623058', '621626', '622986', '622989']},
+            '华夏银行':{'储蓄卡':['622630', '622631', '622632', '622633']},
+        }
+        self._bin = PrefixTrie({k:(i, j) for i in self._char_bank_bin for j in self._char_bank_bin[i] for k in self._char_bank_bin[i][j]})
+        self._aug_validate = {'bank_number':bank_number_valid}
+        self._matcher = KeywordMatcher({i:getattr(self, '_char_'+i) for i in ['direction']})
+        self._bank_index = FuzzyIndex(self._char_bank_name, fuzz.partial_ratio)
         
-    def predict(self, image, axis=False, model=None):
+    @stateless
+    def predict(self, image, axis=False, model=None, bgr=False):
         self._show_axis = axis
         self._info = '图片模糊或非银行卡图片'
         self._error = '图片模糊或非银行卡图片'
         
-        if isinstance(image, str):
-            self._image = la.image.color_convert(la.image.read_image(image))
-        else:
-            self._image = image
+        self._source, self._source_scale = read_image(image, self._decode_side, bgr)
+        self._image, self._scale = fit_side(self._source, self._side_range)
+        self._scale *= self._source_scale
         self._fit_direction(self._model if model is None else model)
         if isinstance(self._info, str):
             if self._show_axis:
@@ -94,50 +122,60 @@ class OCRYinHangKa():
         self._fit_axis()
         self._fit_characters(self._axis, self._result)
         
+        error_list = [i for i in self._info if '图片模糊' in self._info[i] and i in self._axis]
+        crops = []
+        array = image_array(self._image)
+        for i in error_list:
+            crops += [((i, aug), j) for aug, j in enumerate(crop_variants(array, self._axis[i], 0.8))]
+        number = self._info.get('bank_number', '图片模糊')
+        if '图片模糊' not in number and not card_valid(number):
+            crops.append((('bank_number', 0), crop_array(array, self._axis['bank_number'])))
+        result_crop = ocr_fields(self._model if model is None else model, crops, text_height(self._result), self._aug_validate, self._aug_workers)
+        if '图片模糊' not in number and ('bank_number', 0) in result_crop:
+            t = result_crop[('bank_number', 0)]
+            temp = card_number(''.join([j[1][0] for j in (t[0] if t[0] else [])]))
+            if card_valid(temp):
+                self._info['bank_number'] = temp
+                self._fit_bin()
+        fallback = None
         for aug in [0,1,2]:
             error_list = [i for i in self._info if '图片模糊' in self._info[i]]
             if error_list:
                 self._result_crop = []
                 for i in error_list:
-                    if i not in self._axis:
+                    if (i, aug) not in result_crop:
                         continue
-                    image = la.image.crop(self._image, self._axis[i])
-                    if aug==0:
-                        image = la.image.image_to_array(image)
-                    elif aug==1:
-                        image = la.image.image_to_array(la.image.color_convert(image, la.image.ColorMode.grayscale))[:,:,0]
-                    elif aug==2:
-                        image = la.image.image_to_array(la.image.enhance_brightness(image, 0.8))
-                    t = (self._model if model is None else model).ocr(image, cls=False)
+                    t = result_crop[(i, aug)]
                     if t[0]:
                         for j in t[0]:
                             self._result_crop.append([[self._axis[i][:2], [self._axis[i][2], self._axis[i][1]], 
                                                        self._axis[i][2:], [self._axis[i][0], self._axis[i][3]]], j[1]])
                 self._fit_characters(self._axis, [self._result_crop])
+                number = self._info.get('bank_number', '图片模糊')
+                if 'bank_number' in error_list and '图片模糊' not in number and not card_valid(number):
+                    if fallback is None:
+                        fallback = (number, self._axis['bank_number'])
+                    self._info['bank_number'] = '图片模糊'
+        if fallback is not None and '图片模糊' in self._info['bank_number']:
+            self._info['bank_number'], self._axis['bank_number'] = fallback
 
         self._error = '图片模糊' if [1 for i in self._info if '图片模糊' in self._info[i]] else 'ok'
         self._info = {i:('' if '图片模糊' in j else j) for i,j in self._info.items()}
         if self._show_axis:
-            return {'data':self._info, 'axis':self._axis, 'angle':self._angle, 'error':self._error}
+            return {'data':self._info, 'axis':scale_axis(self._axis, self._scale), 'angle':self._angle, 'error':self._error}
         else:
             return {'data':self._info, 'angle':self._angle, 'error':self._error}
         
     def _fit_direction(self, model):
-        for angle, gray in zip([0, 0, 90, 90, 270, 270, 180, 180], [0, 1,0, 1,0, 1,0, 1]):
-            image = la.image.rotate(self._image, angle, expand=True)
-            if gray==1:
-                image1 = la.image.image_to_array(la.image.color_convert(image, la.image.ColorMode.grayscale))[:,:,0]
-            else:
-                image1 = la.image.image_to_array(image)
-            self._result = model.ocr(image1, cls=False)
+        for angle, image, self._result in ocr_direction(model, self._image, gray=True):
 #             print(angle, gray, self._result)
             vertical = [1 if (i[0][1][0]-i[0][0][0])>(i[0][3][1]-i[0][0][1]) else 0 for i in self._result[0] if len(la.text.sequence_preprocess(i[1][0]))>1]
             if sum(vertical)/max(len(vertical), 0.1)<0.7:
                 continue
             
             text = ' '.join([i[1][0] for i in self._result[0]])
-            if sum([1 for char in self._char_direction if char in text])>2:
-                self._image = image
+            if len(self._matcher.match(text)['direction'])>2:
+                self._image = image()
                 self._angle = angle
                 self._info = {i:'图片模糊' for i in self._keys if i in self._name_list}
                 break
@@ -169,15 +207,14 @@ class OCRYinHangKa():
             return 0
 
         axis_true = {i:tuple(axis[i]) for i in axis}
+        geometry, overlap = line_geometry(result[0], axis_true)
         
         text = ' '.join([la.text.sequence_preprocess(i[1][0]) for i in self._result[0]])
 #         print(text)
         if '图片模糊' in self._info.get('bank_name', ''):
             if [i for i in ['银', '行', '信用社'] if i in text]:
-                score = [(char, fuzz.partial_ratio(char, text)) for char in self._char_bank_name]
-    #             print(sorted(score, key=lambda x:x[1]))
-                score = sorted(score, key=lambda x:x[1])[-1]
-                if score[1]>=60:
+                score = self._bank_index.best(text, 60)
+                if score is not None:
                     self._info['bank_name'] = score[0]
         if '图片模糊' in self._info.get('bank_type', ''):
             if [i for i in ['借记', '记卡', '储蓄', '蓄卡'] if i in text]:
@@ -186,23 +223,16 @@ class OCRYinHangKa():
                 self._info['bank_type'] = '信用卡'
         
         bank_number = []
-        for i in result[0]:
-            h = max((i[0][3][1]+i[0][2][1]-i[0][1][1]-i[0][0][1])/2, 1)
-            w = max((i[0][1][0]+i[0][2][0]-i[0][0][0]-i[0][3][0])/2, 1)
-            x = min(i[0][0][0], i[0][3][0])
-            y = min(i[0][0][1], i[0][1][1])
+        for k, i in enumerate(result[0]):
+            h = max(geometry['h'][k], 1)
+            w = max(geometry['w'][k], 1)
+            x = geometry['x'][k]
+            y = geometry['y'][k]
             if '图片模糊' in self._info.get('bank_number', '') and 'bank_number' in self._axis:
-                h1 = min(max(i[0][3][1], i[0][2][1]), axis_true['bank_number'][3])-max(min(i[0][0][1], i[0][1][1]), axis_true['bank_number'][1])
-                w1 = min(max(i[0][1][0], i[0][2][0]), axis_true['bank_number'][2])-max(min(i[0][0][0], i[0][3][0]), axis_true['bank_number'][0])            
+                h1 = overlap['bank_number'][0][k]
+                w1 = overlap['bank_number'][1][k]
                 if h1/h>0.6 and w1/w>0.6:
-                    temp = i[1][0].replace('b', '6')
-                    temp = ''.join([char for char in temp if char in '0123456789'])
-                    if 20>len(temp)>14:
-                        if len(temp) in [15, 18]:
-                            temp = '6'+temp
-                        elif len(temp)==19 and temp[0] not in '469':
-                            temp = '6'+temp[1:]
-                    bank_number.append((temp, [x,y]+i[0][2]))
+                    bank_number.append((card_number(i[1][0]), [x,y]+i[0][2]))
 #         print(bank_number)
         if bank_number:
             if len(bank_number)==1 and len(bank_number[-1][0]) in [16,17,19]:
@@ -217,16 +247,55 @@ class OCRYinHangKa():
                     self._info['bank_number'] = ''.join([i[0] for i in temp])
                     self._axis['bank_number'] = temp[0][1][:2]+temp[-1][1][-2:]
                 
+        self._fit_bin()
         if '图片模糊' in self._info.get('bank_type', ''):
             self._info['bank_type'] = '储蓄卡'
+
+    def _fit_bin(self):
+        hit = self._card_bin(self._info.get('bank_number', ''))
+        if hit is not None:
+            if '图片模糊' in self._info.get('bank_name', ''):
+                self._info['bank_name'] = hit[0]
+            if '图片模糊' in self._info.get('bank_type', ''):
+                self._info['bank_type'] = hit[1]
+
+    def _card_bin(self, number):
+        """`(bank_name, bank_type)` from the issuer prefix (first 6-8 digits) of a valid card number, else None."""
+        if not card_valid(number):
+            return None
+        hit = self._bin.longest(number[:8])
+        return None if hit is None else hit[1]
     
-    def draw_mask(self):
-        image = self._image.copy()
+    def draw_mask(self, image=None, axis=None, bgr=False):
+        if image is None or axis is None:
+            raise ValueError('`draw_mask` needs the `image` and its `predict(image, axis=True)` result as `axis`.')
+        image = rotate_image(read_image(image, bgr=bgr)[0], axis['angle']).copy()
         try:
-            t = [la.image.box_convert(self._axis[i], 'xyxy', 'axis') for i in self._axis if i in self._keys]
+            t = [la.image.box_convert(axis['axis'][i], 'xyxy', 'axis') for i in axis['axis'] if i in self._keys]
             if len(t)>0:
                 image = la.image.draw_box(image, t, width=2)
         except:
             pass
         return image
     
+
+
+def card_number(text):
+    """Digits of an OCR'd card number, with a lost or misread leading '6' restored."""
+    temp = ''.join([char for char in text.replace('b', '6') if char in '0123456789'])
+    if 20>len(temp)>14:
+        if len(temp) in [15, 18]:
+            temp = '6'+temp
+        elif len(temp)==19 and temp[0] not in '469':
+            temp = '6'+temp[1:]
+    return temp
+
+
+def card_valid(number):
+    """True for a 16, 17 or 19 digit card number passing the Luhn check."""
+    return len(number) in [16,17,19] and luhn_valid(number)
+
+
+def bank_number_valid(text):
+    """Crop retry check for `bank_number`: the recognized text holds a valid card number."""
+    return card_valid(card_number(text))
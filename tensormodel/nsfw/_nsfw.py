@@ -6,6 +6,8 @@ import linora as la
 import tensorflow as tf
 from tensorflow.keras import layers
 
+from tensormodel._ocr_engine import read_image
+
 __all__ = ['NSFW_Model']
 
 
@@ -93,9 +95,8 @@ def make_open_nsfw_model(input_shape=(224, 224, 3)):
     model = tf.keras.Model(image_input, output)
     return model
 
-def preprocess_image(image):
-    if isinstance(image, str):
-        image = la.image.read_image(image)
+def preprocess_image(image, bgr=False):
+    image = read_image(image, bgr=bgr)[0]
     image = la.image.color_convert(image, la.image.ColorMode.RGB)
     image = la.image.resize(image, (224, 224), la.image.ResizeMode.BILINEAR)
     image = la.image.image_to_array(image)
@@ -112,10 +113,12 @@ class NSFW_Model():
         self.model = make_open_nsfw_model()
         self.model.load_weights(weights_path)
         
-    def predict_images(self, image_file, batch_size=None):
-        if isinstance(image_file, str):
+    def predict_images(self, image_file, batch_size=None, bgr=False):
+        """`image_file` is one image or a list of them: paths, encoded bytes, file-like objects,
+        HWC uint8 arrays (RGB, or BGR with `bgr=True`) or PIL images."""
+        if not isinstance(image_file, (list, tuple)) and not (isinstance(image_file, np.ndarray) and image_file.ndim==4):
             image_file = [image_file]
-        images = np.array([preprocess_image(image_path) for image_path in image_file])
+        images = np.array([preprocess_image(image_path, bgr) for image_path in image_file])
         predictions = self.model.predict(images, batch_size=len(images) if batch_size is None else batch_size)
         return [round(i, 4) for i in predictions[:,1].tolist()]
 
@@ -0,0 +1,35 @@
+import numpy as np
+
+from tensormodel._ocr_backend import ONNXBackend
+
+
+def _backend(boxes):
+    backend = ONNXBackend.__new__(ONNXBackend)
+    seen = []
+    def detect(array):
+        seen.append(array.shape)
+        return [np.array(i, dtype=np.float32) for i in boxes]
+    def recognize_batch(arrays):
+        seen.extend([i.shape for i in arrays])
+        return [(f'line{n}', 0.9 if n else 0.1) for n in range(len(arrays))]
+    backend.detect = detect
+    backend.recognize_batch = recognize_batch
+    return backend, seen
+
+
+def test_ocr_output_shapes():
+    boxes = [[[10, 40], [90, 40], [90, 60], [10, 60]], [[10, 10], [90, 10], [90, 30], [10, 30]]]
+    array = np.zeros((80, 100, 4), dtype=np.uint8)
+    backend, seen = _backend(boxes)
+    assert backend.ocr(array)==[[[boxes[0], ('line1', 0.9)]]]
+    assert all([i[2]==3 for i in seen])
+    assert backend.ocr(array, rec=False)==[[boxes[1], boxes[0]]]
+    assert _backend([])[0].ocr(array)==[None]
+    assert _backend([])[0].ocr(array, rec=False)==[None]
+
+
+def test_ocr_recognition_only():
+    backend, seen = _backend([])
+    crops = [np.zeros((20, 60), dtype=np.uint8), np.zeros((20, 40, 4), dtype=np.uint8)]
+    assert backend.ocr([crops], det=False, cls=False)==[[('line0', 0.1), ('line1', 0.9)]]
+    assert seen==[(20, 60, 3), (20, 40, 3)]
@@ -0,0 +1,66 @@
+import time
+import random
+
+from tensormodel._ocr_check import luhn_valid, idcard_check, idcard_valid, find_idcard
+
+
+def _idcard(body):
+    return body+idcard_check(body)
+
+
+def _find_idcard(text):
+    year = time.localtime().tm_year
+    first = None
+    for i in range(len(text)-17):
+        window = text[i:i+18]
+        if idcard_valid(window):
+            return (i, True)
+        y, m, d = window[6:10], window[10:12], window[12:14]
+        if first is None and 'X' not in window[:17] and 1900<int(y)<year and 0<int(m)<13 and 0<int(d)<32:
+            first = i
+    return None if first is None else (first, False)
+
+
+def test_idcard_valid():
+    number = _idcard('11010119900307123')
+    assert idcard_valid(number)
+    assert not idcard_valid(number[:17]+('0' if number[17]!='0' else '1'))
+    assert not idcard_valid(_idcard('99010119900307123'))
+    assert not idcard_valid(_idcard('11010119900230123'))
+    assert not idcard_valid(_idcard('11010130000101123'))
+    assert not idcard_valid(number[:17])
+
+
+def test_find_idcard_matches_window_scan():
+    random.seed(0)
+    number = _idcard('44030519851231002')
+    texts = ['', number, '12'+number+'34', '19900101'*4, 'X'*20+number]
+    for _ in range(300):
+        text = ''.join(random.choice('0123456789X') for _ in range(random.randint(0, 40)))
+        if random.random()<0.5:
+            n = random.randint(0, len(text))
+            date = f'{random.randint(1890, 2030)}{random.randint(0, 13):02d}{random.randint(0, 32):02d}'
+            text = text[:n]+random.choice([number, '110101'+date+'123'+random.choice('0123456789X')])+text[n:]
+        texts.append(text)
+    for text in texts:
+        assert find_idcard(text)==_find_idcard(text), text
+
+
+def _luhn_digit(body):
+    total = 0
+    for n, char in enumerate(reversed(body)):
+        d = int(char)*(1 if n%2 else 2)
+        total += d//10+d%10
+    return str(-total%10)
+
+
+def test_luhn_valid():
+    random.seed(0)
+    assert luhn_valid('4111111111111111')
+    assert not luhn_valid('4111111111111112')
+    assert not luhn_valid('')
+    assert not luhn_valid('41111111111111a1')
+    for _ in range(300):
+        body = ''.join(random.choice('0123456789') for _ in range(random.randint(1, 19)))
+        assert luhn_valid(body+_luhn_digit(body))
+        assert not luhn_valid(body+str((int(_luhn_digit(body))+random.randint(1, 9))%10))
@@ -0,0 +1,47 @@
+import pickle
+import sqlite3
+import itertools
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tensormodel import _ocr_engine
+from tensormodel._ocr_engine import rotate_boxes, rotate_image, SQLiteStore
+
+
+@pytest.mark.parametrize('angle', [0, 90, 180, 270])
+def test_rotate_boxes_follows_rotate_image(angle):
+    w, h, (x0, y0, x1, y1) = 40, 30, (5, 3, 17, 9)
+    array = np.zeros((h, w), dtype=np.uint8)
+    array[y0:y1, x0:x1] = 255
+    rotated = np.asarray(rotate_image(Image.fromarray(array), angle))
+    ys, xs = np.nonzero(rotated)
+    box = rotate_boxes([[[x0, y0], [x1, y0], [x1, y1], [x0, y1]]], angle, (w, h))[0]
+    assert box.tolist()==[[xs.min(), ys.min()], [xs.max()+1, ys.min()], [xs.max()+1, ys.max()+1], [xs.min(), ys.max()+1]]
+
+
+def test_rotate_boxes_rejects_other_angles():
+    with pytest.raises(ValueError):
+        rotate_boxes([[[0, 0], [1, 0], [1, 1], [0, 1]]], 45, (2, 2))
+
+
+def test_sqlite_store_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(_ocr_engine.time, 'time', lambda: next(clock))
+    size = len(pickle.dumps('x'*100, protocol=pickle.HIGHEST_PROTOCOL))
+    store = SQLiteStore(str(tmp_path/'cache.db'), max_size=size*3)
+    for key in 'abc':
+        store[key] = 'x'*100
+    assert store['a']=='x'*100
+    store['d'] = 'x'*100
+    assert [i in store for i in 'abcd']==[True, False, True, True]
+    store['e'] = 'x'*200
+    assert [i in store for i in 'acde']==[False, False, True, True]
+    store.close()
+
+    conn = sqlite3.connect(str(tmp_path/'cache.db'))
+    total, meta = conn.execute("SELECT (SELECT SUM(size) FROM cache), value FROM meta WHERE name='size'").fetchone()
+    conn.close()
+    assert total==meta<=size*3
+    assert len(SQLiteStore(str(tmp_path/'cache.db'), max_size=size*3))==2
@@ -0,0 +1,33 @@
+import random
+
+from fuzzywuzzy import fuzz
+
+from tensormodel._ocr_match import FuzzyIndex, PrefixTrie
+from tensormodel._ocr_yinhangka import OCRYinHangKa
+
+
+def test_fuzzy_index_matches_partial_ratio_scan():
+    random.seed(0)
+    words = OCRYinHangKa(model=None)._char_bank_name[::40]
+    index = FuzzyIndex(words, fuzz.partial_ratio)
+    chars = ''.join(sorted(set(''.join(words))))+'卡号0123'
+    texts = ['', '借记卡']+words[::4]
+    for _ in range(100):
+        texts.append(''.join(random.choice(chars) for _ in range(random.randint(1, 12))))
+    for text in texts:
+        assert index.best(text)==sorted([(i, fuzz.partial_ratio(i, text)) for i in words], key=lambda x:x[1])[-1], text
+
+
+def test_fuzzy_index_threshold():
+    index = FuzzyIndex(['中国银行', '交通银行'], fuzz.partial_ratio)
+    assert index.best('交通', 90)==('交通银行', 100)
+    assert index.best('招商', 10) is None
+    assert FuzzyIndex([]).best('交通') is None
+
+
+def test_prefix_trie_longest():
+    trie = PrefixTrie({'62':'a', '6222':'b', '622202':'c'})
+    assert trie.longest('62220212')==('622202', 'c')
+    assert trie.longest('622288')==('6222', 'b')
+    assert trie.longest('6299')==('62', 'a')
+    assert trie.longest('4111') is None
@@ -0,0 +1,17 @@
+from tensormodel._ocr_check import idcard_check
+from tensormodel._ocr_shenfenzheng import find_shenfenzheng, user_number_valid
+
+
+def test_find_shenfenzheng():
+    number = '11010119900307123'+idcard_check('11010119900307123')
+    assert find_shenfenzheng('公民身份号码'+number, full_date=False)==[number, '男', '1990年3月7日', True]
+    assert user_number_valid('公民身份号码'+number)
+
+
+def test_seventeen_characters_are_not_validated():
+    number = '11010119900307123'+idcard_check('11010119900307123')
+    for n in range(18):
+        text = number[:n]+number[n+1:]
+        temp = find_shenfenzheng(text)
+        assert not temp or not temp[3]
+        assert not user_number_valid(text)
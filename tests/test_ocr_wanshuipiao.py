@@ -0,0 +1,30 @@
+import numpy as np
+
+from tensormodel._ocr_wanshuipiao import amount_transform, amount_transform_batch, remark, remark_batch
+
+
+def test_amount_transform():
+    assert amount_transform('100.00')=='(人民币)壹佰元整'
+    assert amount_transform('12')=='(人民币)壹拾贰元整'
+    assert amount_transform('100010.01')=='(人民币)壹拾万零零壹拾元壹分'
+    assert amount_transform('abc')==''
+
+
+def test_amount_transform_batch_matches_amount_transform():
+    data = ['100.00', '12', '100010.01', '12', 'abc', '']
+    expected = [amount_transform(i) if i else '' for i in data]
+    assert amount_transform_batch(data)==expected
+    assert amount_transform_batch(np.array(data))==expected
+    assert amount_transform_batch([i.encode('utf-8') for i in data]+[None])==expected+['']
+
+
+def test_remark_batch_matches_remark():
+    data = ['计税金额:100000.00税率:0.03 房源编号:123 地址:北京市海淀区中关村大街1号',
+            '计税金额100000税率3% 共有人张三',
+            '',
+            '计税金额:100000.00税率:0.03 房源编号:123 地址:北京市海淀区中关村大街1号']
+    result = remark_batch(data)
+    for n, i in enumerate(data):
+        for key, value in remark(i).items():
+            assert result[key][n]==value
+    assert remark_batch(np.array(data))==result
@@ -0,0 +1,38 @@
+import random
+
+from tensormodel._ocr_yinhangka import OCRYinHangKa, card_number, bank_number_valid
+
+
+def _luhn_digit(body):
+    total = 0
+    for n, char in enumerate(reversed(body)):
+        d = int(char)*(1 if n%2 else 2)
+        total += d//10+d%10
+    return str(-total%10)
+
+
+def _card_bin(table, number):
+    hits = [(len(k), name, kind) for name in table for kind in table[name] for k in table[name][kind] if number.startswith(k)]
+    return max(hits)[1:] if hits else None
+
+
+def test_card_bin_matches_prefix_scan():
+    random.seed(0)
+    parser = OCRYinHangKa(model=None)
+    table = parser._char_bank_bin
+    prefixes = [k for name in table for kind in table[name] for k in table[name][kind]]
+    for _ in range(500):
+        prefix = random.choice(prefixes+['999999', '6'])
+        body = prefix+''.join(random.choice('0123456789') for _ in range(random.choice([16, 17, 19])-len(prefix)-1))
+        number = body+_luhn_digit(body)
+        assert parser._card_bin(number)==_card_bin(table, number), number
+        broken = body+str((int(_luhn_digit(body))+1)%10)
+        assert parser._card_bin(broken) is None
+
+
+def test_bank_number_valid():
+    body = '622202'+'123456789'
+    number = body+_luhn_digit(body)
+    assert card_number(number[1:])==number
+    assert bank_number_valid(' '.join([number[:4], number[4:8], number[8:12], number[12:]]))
+    assert not bank_number_valid(number[:-1]+str((int(number[-1])+1)%10))